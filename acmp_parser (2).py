@@ -3,90 +3,2637 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-from openai import OpenAI
+from openai import AsyncOpenAI, RateLimitError, APIStatusError, APIConnectionError, APITimeoutError
+from lxml import html as lxml_html
+from requests.adapters import HTTPAdapter
+from urllib.parse import urljoin, urlencode, urlparse
+import requests
+import subprocess
+import sys
+import tempfile
 import time
 import re
 import warnings
 import json
 import os
+import sqlite3
+import argparse
+import asyncio
+import threading
+import queue
+import random
+import hashlib
+import math
+import zlib
+import ast
+import builtins
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from collections.abc import Mapping
 from datetime import datetime
+from enum import Enum
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
 
+def atomic_write_json(path, data, mode=0o666):
+    """Атомарно записываем JSON: временный файл + os.replace.
+    mode - права файла (с учетом umask); временный файл создается сразу с ними"""
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        # Оставшийся после сбоя временный файл мог быть создан с другими правами
+        os.remove(tmp_path)
+    with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, mode), 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def task_id_from_url(task_url):
+    match = re.search(r'id_task=(\d+)', task_url)
+    return int(match.group(1)) if match else task_url
+
+
+def content_hash(*parts):
+    """sha256 от частей ключа (строки или JSON-сериализуемые объекты)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, str):
+            part = json.dumps(part, ensure_ascii=False, sort_keys=True)
+        digest.update(part.encode('utf-8'))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """Кэш на диске (SQLite) с TTL по пространствам имен, LRU вытеснением по размеру и счетчиками"""
+
+    def __init__(self, cache_dir=".acmp_cache", max_bytes=200 * 1024 * 1024, ttl=None, refresh=False):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl or {"task": 30 * 24 * 3600, "llm": 7 * 24 * 3600}
+        self.refresh = refresh
+        self.lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+        self.conn = sqlite3.connect(os.path.join(cache_dir, "cache.sqlite"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS entries (
+                                 key TEXT PRIMARY KEY,
+                                 namespace TEXT NOT NULL,
+                                 value TEXT NOT NULL,
+                                 size INTEGER NOT NULL,
+                                 created REAL NOT NULL,
+                                 accessed REAL NOT NULL)""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed)")
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, namespace, key):
+        """Значение из кэша или None (при --refresh всегда промах)"""
+        full_key = f"{namespace}:{key}"
+        with self.lock:
+            row = None
+            if not self.refresh:
+                row = self.conn.execute("SELECT value, created FROM entries WHERE key = ?", (full_key,)).fetchone()
+            now = time.time()
+            if row and now - row[1] > self.ttl.get(namespace, float("inf")):
+                self._delete(full_key)
+                row = None
+            if row is None:
+                self.misses[namespace] = self.misses.get(namespace, 0) + 1
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, full_key))
+            self.hits[namespace] = self.hits.get(namespace, 0) + 1
+            return json.loads(row[0])
+
+    def put(self, namespace, key, value):
+        full_key = f"{namespace}:{key}"
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode('utf-8'))
+        now = time.time()
+        with self.lock:
+            self._delete(full_key)
+            with self.conn:
+                self.conn.execute("INSERT INTO entries (key, namespace, value, size, created, accessed) "
+                                  "VALUES (?, ?, ?, ?, ?, ?)", (full_key, namespace, data, size, now, now))
+            self.total_bytes += size
+            self._evict()
+
+    def _delete(self, full_key):
+        row = self.conn.execute("SELECT size FROM entries WHERE key = ?", (full_key,)).fetchone()
+        if row:
+            with self.conn:
+                self.conn.execute("DELETE FROM entries WHERE key = ?", (full_key,))
+            self.total_bytes -= row[0]
+
+    def _evict(self):
+        """Вытесняем давно не использованные записи, пока кэш больше лимита"""
+        while self.total_bytes > self.max_bytes:
+            rows = self.conn.execute("SELECT key, size FROM entries ORDER BY accessed LIMIT 100").fetchall()
+            if not rows:
+                self.total_bytes = 0
+                return
+            with self.conn:
+                for key, size in rows:
+                    self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self.total_bytes -= size
+                    if self.total_bytes <= self.max_bytes:
+                        break
+
+    def report(self):
+        parts = []
+        for namespace in sorted(set(self.hits) | set(self.misses)):
+            parts.append(f"{namespace}: попаданий {self.hits.get(namespace, 0)}, промахов {self.misses.get(namespace, 0)}")
+        print(f"Кэш ({self.total_bytes / 1024 / 1024:.1f} Мб): " + ("; ".join(parts) if parts else "не использовался"))
+
+    def close(self):
+        self.conn.close()
+
+
+def percentile(values, q):
+    """Перцентиль по методу ближайшего ранга"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, math.ceil(q / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+class RunTracer:
+    """Замеры времени по этапам решения задач: записи по задачам в JSONL и итоговая сводка"""
+
+    def __init__(self, trace_file="run_trace.jsonl"):
+        self.trace_file = trace_file
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.durations = {}
+        self.verdicts = {}
+        self.tokens = {"prompt_tokens": 0, "completion_tokens": 0}
+        self.tasks_done = 0
+        self.started_at = time.time()
+
+    def current(self):
+        return getattr(self.local, "record", None)
+
+    @contextmanager
+    def task(self, task_id):
+        """Запись о задаче для текущего потока; по завершении дописывается в trace_file"""
+        record = {"task_id": task_id, "started": datetime.now().isoformat(), "stages": {}, "verdicts": [],
+                  "usage": {"prompt_tokens": 0, "completion_tokens": 0}}
+        self.local.record = record
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["total"] = round(time.perf_counter() - start, 3)
+            record["stages"] = {name: round(value, 3) for name, value in record["stages"].items()}
+            self.local.record = None
+            with self.lock:
+                self.tasks_done += 1
+                for key in self.tokens:
+                    self.tokens[key] += record["usage"].get(key, 0)
+                try:
+                    with open(self.trace_file, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                except Exception as e:
+                    print(f"Ошибка записи трассировки: {e}")
+
+    @contextmanager
+    def span(self, name):
+        """Замер этапа внутри текущей задачи"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            record = self.current()
+            if record is not None:
+                record["stages"][name] = record["stages"].get(name, 0.0) + duration
+            with self.lock:
+                self.durations.setdefault(name, []).append(duration)
+
+    def usage(self):
+        """Счетчик токенов текущей задачи (или отдельный, если задачи нет)"""
+        record = self.current()
+        return record["usage"] if record is not None else {"prompt_tokens": 0, "completion_tokens": 0}
+
+    def merge_usage(self, usage):
+        target = self.usage()
+        for key, value in usage.items():
+            target[key] = target.get(key, 0) + value
+
+    def verdict(self, result):
+        record = self.current()
+        if record is not None:
+            record["verdicts"].append(result)
+        with self.lock:
+            key = re.sub(r'\d+', 'N', result or "Unknown")
+            self.verdicts[key] = self.verdicts.get(key, 0) + 1
+
+    def summary(self):
+        elapsed = max(time.time() - self.started_at, 1e-9)
+        print("\nВремя по этапам (с):")
+        print(f"  {'этап':<24}{'кол-во':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'всего':>10}")
+        for name, values in sorted(self.durations.items(), key=lambda item: -sum(item[1])):
+            print(f"  {name:<24}{len(values):>8}{percentile(values, 50):>9.2f}{percentile(values, 95):>9.2f}"
+                  f"{percentile(values, 99):>9.2f}{sum(values):>10.1f}")
+        print(f"Задач в час: {self.tasks_done / elapsed * 3600:.1f}")
+        print(f"Токены LLM: запрос {self.tokens['prompt_tokens']}, ответ {self.tokens['completion_tokens']}")
+        accepted = self.verdicts.get("Accepted", 0)
+        if accepted:
+            print(f"Посылок на одно Accepted: {sum(self.verdicts.values()) / accepted:.2f}")
+        if self.verdicts:
+            print("Вердикты: " + ", ".join(f"{verdict}: {count}" for verdict, count in
+                                           sorted(self.verdicts.items(), key=lambda item: -item[1])))
+        print(f"Трассировка по задачам: {self.trace_file}")
+
+
+class RateLimiter:
+    """Token bucket: общий для процесса (и всех сессий пула) лимит запросов к сайту"""
+
+    def __init__(self, rate=2.0, burst=4):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Ждем, пока в ведре появится токен"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+class RunManifest:
+    """Состояние прогона по задачам (pending, in_progress, accepted, exhausted) для продолжения после сбоя"""
+
+    STATES = ("pending", "in_progress", "accepted", "exhausted")
+
+    def __init__(self, manifest_file="run_manifest.json"):
+        self.manifest_file = manifest_file
+        self.lock = threading.Lock()
+        self.tasks = {}
+        if os.path.exists(manifest_file):
+            try:
+                with open(manifest_file, 'r', encoding='utf-8') as f:
+                    self.tasks = json.load(f).get("tasks", {})
+            except Exception as e:
+                print(f"Ошибка загрузки манифеста прогона: {e}")
+        # Задачи, прерванные сбоем или Ctrl-C, начинаем заново
+        for entry in self.tasks.values():
+            if entry["state"] == "in_progress":
+                entry["state"] = "pending"
+
+    def state(self, task_id):
+        entry = self.tasks.get(str(task_id))
+        return entry["state"] if entry else "pending"
+
+    def set_state(self, task_id, state):
+        with self.lock:
+            entry = self.tasks.setdefault(str(task_id), {"state": "pending", "runs": 0})
+            entry["state"] = state
+            entry["updated"] = datetime.now().isoformat()
+            if state == "in_progress":
+                entry["runs"] += 1
+            self.save()
+
+    def save(self):
+        try:
+            atomic_write_json(self.manifest_file, {"tasks": self.tasks})
+        except Exception as e:
+            print(f"Ошибка сохранения манифеста прогона: {e}")
+
+    def reset(self):
+        with self.lock:
+            self.tasks = {}
+            self.save()
+
+    def summary(self):
+        counts = {state: 0 for state in self.STATES}
+        for entry in self.tasks.values():
+            counts[entry["state"]] += 1
+        return counts
+
+
+class SessionStore:
+    """Сохраненная авторизованная сессия (куки, пользователь, user agent): вход выполняется один раз
+    и переживает перезапуски, пока сайт принимает куки"""
+
+    def __init__(self, session_file="acmp_session.json"):
+        self.session_file = session_file
+
+    def load(self):
+        """Сессия без истекших кук или None"""
+        if not os.path.exists(self.session_file):
+            return None
+        try:
+            with open(self.session_file, 'r', encoding='utf-8') as f:
+                session = json.load(f)
+        except Exception as e:
+            print(f"Ошибка загрузки сохраненной сессии: {e}")
+            return None
+        now = time.time()
+        session["cookies"] = [cookie for cookie in session.get("cookies", [])
+                              if not cookie.get("expiry") or cookie["expiry"] > now]
+        return session if session["cookies"] else None
+
+    def save(self, cookies, user_id=None, user_name=None, user_agent=None):
+        if not cookies:
+            return
+        try:
+            # В файле куки входа - читать его может только владелец, в том числе пока он пишется
+            atomic_write_json(self.session_file, {"cookies": cookies, "user_id": user_id, "user_name": user_name,
+                                                  "user_agent": user_agent, "saved": datetime.now().isoformat()},
+                              mode=0o600)
+        except Exception as e:
+            print(f"Ошибка сохранения сессии: {e}")
+
+    def clear(self):
+        if os.path.exists(self.session_file):
+            os.remove(self.session_file)
+
+
+class JsonlSolutionStore:
+    """Хранилище попыток: append-only журнал JSONL и append-only индекс смещений по задачам"""
+
+    def __init__(self, history_file="solutions_history.jsonl", best_file="best_solutions.jsonl"):
+        self.history_file = history_file
+        self.best_file = best_file
+        # Строка индекса на каждую запись журнала: [task_id, смещение, конец записи]
+        self.index_file = history_file + ".offsets"
+        # Отпечатки попыток с известным вердиктом: [task_id, отпечаток, статус, вердикт] на строку
+        self.verdicts_file = history_file + ".verdicts"
+        self.index = {}
+        self._indexed_size = 0
+        self._index_handle = None
+        self._load_index()
+
+    def _load_index(self):
+        """При старте читаем только индекс и догоняем хвост журнала, записанный после него"""
+        good_index_size = 0
+        if os.path.exists(self.index_file):
+            with open(self.index_file, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        task_id, offset, end = json.loads(line)
+                    except ValueError:
+                        break
+                    self.index.setdefault(task_id, []).append(offset)
+                    self._indexed_size = max(self._indexed_size, end)
+                    good_index_size += len(line)
+
+        file_size = os.path.getsize(self.history_file) if os.path.exists(self.history_file) else 0
+        if self._indexed_size > file_size:
+            # Индекс от другого журнала - перестраиваем с нуля
+            self.index, self._indexed_size, good_index_size = {}, 0, 0
+        if os.path.exists(self.index_file) and good_index_size < os.path.getsize(self.index_file):
+            with open(self.index_file, 'r+b') as f:
+                f.truncate(good_index_size)
+        self._index_handle = open(self.index_file, 'ab')
+        if self._indexed_size < file_size:
+            self._scan_tail()
+
+    def _index_append(self, task_id, offset, end):
+        self.index.setdefault(task_id, []).append(offset)
+        self._index_handle.write((json.dumps([task_id, offset, end]) + "\n").encode('utf-8'))
+        self._indexed_size = end
+
+    def _scan_tail(self):
+        """Дочитываем журнал после проиндексированной части, обрезая недописанную строку"""
+        good_size = self._indexed_size
+        with open(self.history_file, 'rb') as f:
+            f.seek(self._indexed_size)
+            offset = self._indexed_size
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                self._index_append(str(record["task_id"]), offset, offset + len(line))
+                offset += len(line)
+                good_size = offset
+
+        if good_size < os.path.getsize(self.history_file):
+            print(f"Журнал {self.history_file} обрезан после сбоя записи, восстанавливаем...")
+            with open(self.history_file, 'r+b') as f:
+                f.truncate(good_size)
+        self._indexed_size = good_size
+        self.flush()
+
+    def is_empty(self):
+        return not self.index and not os.path.exists(self.best_file)
+
+    def task_ids(self):
+        return list(self.index.keys())
+
+    def count_attempts(self, task_id):
+        return len(self.index.get(str(task_id), []))
+
+    def get_attempts(self, task_id, last=None):
+        offsets = self.index.get(str(task_id), [])
+        if last is not None:
+            offsets = offsets[-last:]
+        attempts = []
+        with open(self.history_file, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                attempts.append(json.loads(f.readline())["entry"])
+        return attempts
+
+    def append_attempt(self, task_id, entry):
+        line = (json.dumps({"task_id": str(task_id), "entry": entry}, ensure_ascii=False) + "\n").encode('utf-8')
+        with open(self.history_file, 'ab') as f:
+            offset = f.tell()
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        # Индекс дописывается без fsync: потерянный после сбоя хвост восстановит _scan_tail
+        self._index_append(str(task_id), offset, offset + len(line))
+        self._index_handle.flush()
+
+    def load_verdicts(self):
+        """Сохраненные отпечатки или None, если их еще нет (история старого формата)"""
+        if not os.path.exists(self.verdicts_file) or not os.path.exists(self.history_file):
+            return None
+        verdicts = []
+        with open(self.verdicts_file, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    verdicts.append(json.loads(line))
+                except ValueError:
+                    break
+        return verdicts
+
+    def save_verdicts(self, verdicts):
+        tmp_path = self.verdicts_file + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.writelines((json.dumps(verdict, ensure_ascii=False) + "\n").encode('utf-8') for verdict in verdicts)
+        os.replace(tmp_path, self.verdicts_file)
+
+    def append_verdict(self, task_id, fingerprint, status, result):
+        line = json.dumps([str(task_id), fingerprint, status, result], ensure_ascii=False) + "\n"
+        with open(self.verdicts_file, 'ab') as f:
+            f.write(line.encode('utf-8'))
+
+    def load_best(self):
+        """Лучшие решения: последняя запись по задаче побеждает"""
+        best = {}
+        if not os.path.exists(self.best_file):
+            return best
+        with open(self.best_file, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                best[str(record["task_id"])] = record["entry"]
+        return best
+
+    def save_best(self, task_id, entry):
+        line = (json.dumps({"task_id": str(task_id), "entry": entry}, ensure_ascii=False) + "\n").encode('utf-8')
+        with open(self.best_file, 'ab') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def flush(self):
+        """Сбрасываем индекс смещений на диск (журнал и так уже на диске)"""
+        self._index_handle.flush()
+        os.fsync(self._index_handle.fileno())
+
+    def close(self):
+        self.flush()
+        self._index_handle.close()
+
+
+class SqliteSolutionStore:
+    """Хранилище попыток в SQLite (WAL), каждая запись - отдельная транзакция"""
+
+    def __init__(self, db_file="solutions_history.sqlite"):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS attempts (
+                                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                 task_id TEXT NOT NULL,
+                                 entry TEXT NOT NULL)""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS attempts_task ON attempts(task_id, id)")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS best (
+                                 task_id TEXT PRIMARY KEY,
+                                 entry TEXT NOT NULL)""")
+        self.conn.commit()
+        self.counts = dict(self.conn.execute("SELECT task_id, COUNT(*) FROM attempts GROUP BY task_id"))
+
+    def is_empty(self):
+        has_best = self.conn.execute("SELECT 1 FROM best LIMIT 1").fetchone()
+        return not self.counts and not has_best
+
+    def task_ids(self):
+        return list(self.counts.keys())
+
+    def count_attempts(self, task_id):
+        return self.counts.get(str(task_id), 0)
+
+    def get_attempts(self, task_id, last=None):
+        if last is None:
+            rows = self.conn.execute("SELECT entry FROM attempts WHERE task_id = ? ORDER BY id",
+                                     (str(task_id),)).fetchall()
+        else:
+            rows = self.conn.execute("SELECT entry FROM attempts WHERE task_id = ? ORDER BY id DESC LIMIT ?",
+                                     (str(task_id), last)).fetchall()[::-1]
+        return [json.loads(row[0]) for row in rows]
+
+    def append_attempt(self, task_id, entry):
+        with self.conn:
+            self.conn.execute("INSERT INTO attempts (task_id, entry) VALUES (?, ?)",
+                              (str(task_id), json.dumps(entry, ensure_ascii=False)))
+        self.counts[str(task_id)] = self.counts.get(str(task_id), 0) + 1
+
+    def load_verdicts(self):
+        """Сохраненные отпечатки или None, если таблицы еще нет (история старого формата)"""
+        if not self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'verdicts'").fetchone():
+            return None
+        return self.conn.execute("SELECT task_id, fingerprint, status, result FROM verdicts").fetchall()
+
+    def _create_verdicts(self):
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS verdicts (
+                                 task_id TEXT NOT NULL,
+                                 fingerprint TEXT NOT NULL,
+                                 status TEXT NOT NULL,
+                                 result TEXT NOT NULL)""")
+
+    def save_verdicts(self, verdicts):
+        with self.conn:
+            self._create_verdicts()
+            self.conn.execute("DELETE FROM verdicts")
+            self.conn.executemany("INSERT INTO verdicts VALUES (?, ?, ?, ?)", verdicts)
+
+    def append_verdict(self, task_id, fingerprint, status, result):
+        with self.conn:
+            self._create_verdicts()
+            self.conn.execute("INSERT INTO verdicts VALUES (?, ?, ?, ?)", (str(task_id), fingerprint, status, result))
+
+    def load_best(self):
+        return {task_id: json.loads(entry) for task_id, entry in self.conn.execute("SELECT task_id, entry FROM best")}
+
+    def save_best(self, task_id, entry):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO best (task_id, entry) VALUES (?, ?)",
+                              (str(task_id), json.dumps(entry, ensure_ascii=False)))
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.conn.close()
+
+
+STORAGE_BACKENDS = {
+    "jsonl": JsonlSolutionStore,
+    "sqlite": SqliteSolutionStore,
+}
+
+
+def migrate_json_history(store, solutions_file="solutions_history.json", best_file="best_solutions.json"):
+    """Переносим старые JSON файлы в новое хранилище. Файл переименовывается только после полного
+    переноса: прерванный перенос повторяется при следующем запуске, уже перенесенные попытки
+    пропускаются. Возвращаем число перенесенных попыток"""
+    migrated = 0
+    finished = False
+    if os.path.exists(solutions_file):
+        try:
+            with open(solutions_file, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+            for task_id, attempts in history.items():
+                # Попытки, записанные прерванным переносом, уже лежат в хранилище
+                stored = {}
+                if store.count_attempts(task_id):
+                    for entry in store.get_attempts(task_id):
+                        key = content_hash(entry)
+                        stored[key] = stored.get(key, 0) + 1
+                for entry in attempts:
+                    key = content_hash(entry)
+                    if stored.get(key):
+                        stored[key] -= 1
+                        continue
+                    store.append_attempt(task_id, entry)
+                    migrated += 1
+            store.flush()
+            os.replace(solutions_file, solutions_file + ".migrated")
+            finished = True
+        except Exception as e:
+            print(f"Ошибка миграции истории решений: {e}")
+    if os.path.exists(best_file):
+        try:
+            with open(best_file, 'r', encoding='utf-8') as f:
+                best = json.load(f)
+            # Лучшие решения, записанные после прерванного переноса, новее старых
+            known = store.load_best()
+            for task_id, entry in best.items():
+                if str(task_id) not in known:
+                    store.save_best(task_id, entry)
+            os.replace(best_file, best_file + ".migrated")
+            finished = True
+        except Exception as e:
+            print(f"Ошибка миграции лучших решений: {e}")
+    if finished:
+        print("Старые JSON файлы перенесены в новое хранилище")
+    return migrated
+
+
+class SolutionHistoryView(Mapping):
+    """Словарь {task_id: [попытки]} поверх хранилища; попытки читаются с диска по запросу"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, task_id):
+        if self.store.count_attempts(task_id) == 0:
+            raise KeyError(task_id)
+        return self.store.get_attempts(task_id)
+
+    def __contains__(self, task_id):
+        return self.store.count_attempts(task_id) > 0
+
+    def __iter__(self):
+        return iter(self.store.task_ids())
+
+    def __len__(self):
+        return len(self.store.task_ids())
+
+    def last(self, task_id, n):
+        return self.store.get_attempts(task_id, last=n)
+
+
+def benchmark_store(backend="jsonl", tasks=450, attempts_per_task=3, code_size=800):
+    """Замер стоимости одной записи попытки по мере роста истории"""
+    import tempfile
+    import statistics
+
+    code = "x = 1\n" * (code_size // 6)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if backend == "sqlite":
+            store = SqliteSolutionStore(os.path.join(tmp_dir, "bench.sqlite"))
+        else:
+            store = JsonlSolutionStore(os.path.join(tmp_dir, "bench.jsonl"), os.path.join(tmp_dir, "best.jsonl"))
+
+        total = tasks * attempts_per_task
+        bucket = max(1, total // 10)
+        timings = []
+        for task_id in range(tasks):
+            for attempt in range(1, attempts_per_task + 1):
+                entry = {"timestamp": datetime.now().isoformat(), "attempt": attempt, "code": code,
+                         "status": "Failed", "result": "Wrong answer", "is_accepted": False}
+                start = time.perf_counter()
+                store.append_attempt(task_id, entry)
+                timings.append(time.perf_counter() - start)
+        store.close()
+
+    print(f"Бенчмарк хранилища '{backend}': {total} записей")
+    # Среднее и p99 по отрезкам: редкие дорогие записи (например, перезапись индекса) медиана не покажет
+    for i in range(0, total, bucket):
+        chunk = timings[i:i + bucket]
+        print(f"  записи {i + 1:5d}-{i + len(chunk):5d}: медиана {statistics.median(chunk) * 1000:.3f} мс, "
+              f"среднее {statistics.mean(chunk) * 1000:.3f} мс, p99 {percentile(chunk, 99) * 1000:.3f} мс, "
+              f"макс {max(chunk) * 1000:.3f} мс")
+    print(f"  всего: среднее {statistics.mean(timings) * 1000:.3f} мс, p99 {percentile(timings, 99) * 1000:.3f} мс")
+
+
+def build_task_info(title, description, full_text, input_data, output_data, examples, example_tests=None):
+    """Собираем словарь задачи из разобранных частей страницы"""
+    complete_description = f"""{description}
+
+{full_text}
+
+ВХОДНЫЕ ДАННЫЕ:
+{input_data}
+
+ВЫХОДНЫЕ ДАННЫЕ:
+{output_data}
+
+ПРИМЕРЫ:
+{examples}"""
+
+    return {
+        'title': title,
+        'description': complete_description[:1500] + "..." if len(
+            complete_description) > 1500 else complete_description,
+        'full_description': complete_description,
+        'input_data': input_data,
+        'output_data': output_data,
+        'examples': examples,
+        'example_tests': example_tests or []
+    }
+
+
+# Таблица примеров - та, в чьих собственных строках есть заголовки INPUT.TXT/OUTPUT.TXT
+# (а не внешние таблицы разметки страницы, которые тоже содержат эти th)
+EXAMPLES_TABLE_XPATH = ("//table[./tr/th[contains(text(), 'INPUT.TXT') or contains(text(), 'OUTPUT.TXT')]"
+                        " or ./*/tr/th[contains(text(), 'INPUT.TXT') or contains(text(), 'OUTPUT.TXT')]]")
+
+HTML_BLOCK_TAGS = {"p", "div", "h1", "h2", "h3", "h4", "li", "ul", "ol", "tr", "table", "tbody", "thead",
+                   "pre", "blockquote", "center", "form"}
+
+
+def html_text(element):
+    """Видимый текст элемента lxml, приближенный к WebElement.text"""
+    parts = []
+
+    def walk(node):
+        tag = node.tag if isinstance(node.tag, str) else None
+        if tag is None or tag in ("script", "style"):
+            return
+        if tag == "br" or tag in HTML_BLOCK_TAGS:
+            parts.append("\n")
+        elif tag == "sup":
+            # 10<sup>9</sup> -> 10^9, иначе ограничения превращаются в "109"
+            parts.append("^")
+        if node.text:
+            parts.append(node.text)
+        for child in node:
+            walk(child)
+            if child.tail:
+                parts.append(child.tail)
+        if tag in HTML_BLOCK_TAGS:
+            parts.append("\n")
+        elif tag in ("td", "th"):
+            parts.append(" ")
+
+    walk(element)
+    lines = [re.sub(r'[ \t\r\xa0]+', ' ', line).strip() for line in "".join(parts).split("\n")]
+    return "\n".join(line for line in lines if line)
+
+
+BOUND_MARKERS = re.compile(r'≤|<=|≥|>=|<|>|не превосход|не более|не менее|не больше|не меньше|не превышает')
+
+
+def extract_bounds(input_data):
+    """Предложения с ограничениями из раздела входных данных"""
+    bounds = []
+    for sentence in re.split(r'(?<=[.;])\s+|\n', input_data or ""):
+        sentence = sentence.strip()
+        if sentence and re.search(r'\d', sentence) and BOUND_MARKERS.search(sentence):
+            bounds.append(sentence)
+    return bounds[:8]
+
+
+def parse_task_html(page_html):
+    """Парсинг HTML страницы задачи без браузера (те же поля, что и parse_task_page)"""
+    tree = lxml_html.fromstring(page_html) if isinstance(page_html, str) else page_html
+
+    headers = tree.xpath("//h1")
+    title = html_text(headers[0]) if headers else "Неизвестная задача"
+
+    meta_desc = tree.xpath("//meta[@name='description']/@content")
+    description = meta_desc[0] if meta_desc else ""
+
+    full_text = ""
+    content_divs = tree.xpath("//td[contains(@background, 'notepad2.gif')]")
+    if content_divs:
+        for p in content_divs[0].iter("p"):
+            text = html_text(p)
+            if text:
+                full_text += text + "\n"
+
+    def section(header_text, stop_tags):
+        headers = tree.xpath(f"//h2[contains(text(), '{header_text}')]")
+        if not headers:
+            return ""
+        elements = []
+        for sibling in headers[0].itersiblings():
+            if not isinstance(sibling.tag, str):
+                continue
+            if sibling.tag in stop_tags:
+                break
+            text = html_text(sibling)
+            if text:
+                elements.append(text)
+        return "\n".join(elements)
+
+    input_data = section("Входные данные", ("h2",))
+    output_data = section("Выходные данные", ("h2", "table"))
+
+    examples = ""
+    example_tests = []
+    tables = tree.xpath(EXAMPLES_TABLE_XPATH)
+    if tables:
+        examples = html_text(tables[0])
+        example_tests = parse_example_tests(tables[0])
+
+    task_info = build_task_info(title, description, full_text, input_data, output_data, examples, example_tests)
+    task_info.update(parse_limits(tree.text_content()))
+    return task_info
+
+
+def cell_text(element):
+    """Текст ячейки как есть: <br> - перевод строки, пробелы и пустые строки не схлопываются
+    (во вводе строковых задач они значимы); обрезается только завершающий перевод строки"""
+    parts = []
+
+    def walk(node):
+        if node.text:
+            parts.append(node.text)
+        for child in node:
+            if child.tag == "br":
+                parts.append("\n")
+            elif isinstance(child.tag, str):
+                walk(child)
+            if child.tail:
+                parts.append(child.tail)
+
+    walk(element)
+    return "".join(parts).replace("\r\n", "\n").replace("\xa0", " ").rstrip("\n")
+
+
+def parse_example_tests(table):
+    """Разбираем таблицу примеров в список пар {'input', 'output'}"""
+    if isinstance(table, str):
+        table = lxml_html.fromstring(table)
+    tests = []
+    for row in table.xpath(".//tr[td]"):
+        cells = row.xpath("./td")
+        if len(cells) < 3:
+            continue
+        tests.append({"input": cell_text(cells[-2]) + "\n", "output": html_text(cells[-1])})
+    return tests
+
+
+def parse_submit_form(page_html, page_url):
+    """Находим форму отправки решения: адрес и поля по умолчанию"""
+    tree = lxml_html.fromstring(page_html) if isinstance(page_html, str) else page_html
+    forms = tree.xpath("//form[.//select[@name='lang']]") or tree.xpath("//form[.//textarea]")
+    if not forms:
+        return None
+    form = forms[0]
+
+    fields = {}
+    code_field = None
+    for element in form.xpath(".//input | .//select | .//textarea"):
+        name = element.get("name")
+        if not name:
+            continue
+        if element.tag == "textarea":
+            code_field = code_field or name
+            fields[name] = ""
+        elif element.tag == "select":
+            selected = element.xpath(".//option[@selected]/@value") or element.xpath(".//option/@value")
+            fields[name] = selected[0] if selected else ""
+        elif element.get("type", "text").lower() not in ("submit", "button", "image", "reset", "file"):
+            fields[name] = element.get("value", "")
+
+    return {
+        "action": urljoin(page_url, form.get("action") or page_url),
+        "method": (form.get("method") or "post").lower(),
+        "multipart": "multipart" in (form.get("enctype") or "").lower(),
+        "fields": fields,
+        "code_field": code_field,
+    }
+
+
+def login_status(page_html):
+    """Вход по странице сайта: (авторизован ли, id пользователя, имя пользователя)"""
+    tree = lxml_html.fromstring(page_html) if isinstance(page_html, str) else page_html
+    logout = tree.xpath("//a[contains(@href, 'logout') or contains(@href, 'main=exit')]"
+                        " | //*[contains(text(), 'Выход') or contains(text(), 'Logout')]")
+    user_links = tree.xpath("//a[contains(@href, 'main=user')]")
+    user_id = user_name = None
+    if user_links:
+        match = re.search(r'id=(\d+)', user_links[0].get("href", ""))
+        user_id = match.group(1) if match else None
+        user_name = html_text(user_links[0]) or None
+    return bool(logout or user_links), user_id, user_name
+
+
+class ACMPHttpTransport:
+    """Загрузка задач и отправка решений через пул keep-alive HTTP соединений с куками браузера"""
+
+    def __init__(self, site_url="https://acmp.ru", cookies=None, user_agent=None, pool_size=8, timeout=20,
+                 rate_limiter=None):
+        self.site_url = site_url
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if user_agent:
+            self.session.headers["User-Agent"] = user_agent
+        self.forms = {}
+        self.charset = "windows-1251"
+        if cookies:
+            self.load_cookies(cookies)
+
+    def load_cookies(self, cookies):
+        """Переносим куки из Selenium в HTTP сессию"""
+        for cookie in cookies:
+            self.session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"),
+                                     path=cookie.get("path", "/"), expires=cookie.get("expiry"))
+
+    def decode(self, response):
+        """Декодируем ответ с учетом кодировки страницы (acmp.ru отдает windows-1251)"""
+        charset = requests.utils.get_encoding_from_headers(response.headers)
+        if not charset or charset.lower() == "iso-8859-1":
+            match = re.search(rb'charset=["\']?([\w-]+)', response.content[:2048])
+            charset = match.group(1).decode("ascii") if match else "windows-1251"
+        self.charset = charset
+        return response.content.decode(charset, errors="replace")
+
+    def get(self, url):
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return self.decode(response)
+
+    def get_conditional(self, url, etag=None, last_modified=None):
+        """GET с If-None-Match/If-Modified-Since: (html или None, если не изменилась; ETag; Last-Modified)"""
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return None, etag, last_modified
+        response.raise_for_status()
+        return self.decode(response), response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+    def get_task(self, task_url):
+        """Одним GET загружаем и разбираем страницу задачи"""
+        page_html = self.get(task_url)
+        if "ошибка" in page_html.lower():
+            return None
+        return self.parse_task(task_url, page_html)
+
+    def parse_task(self, task_url, page_html):
+        """Разбираем страницу задачи и запоминаем форму отправки"""
+        tree = lxml_html.fromstring(page_html)
+        form = parse_submit_form(tree, task_url)
+        if form:
+            self.forms[task_url] = form
+        return parse_task_html(tree)
+
+    def submit(self, task_url, code, lang="PY"):
+        """Отправляем решение напрямую POST запросом формы"""
+        form = self.forms.get(task_url)
+        if form is None:
+            form = parse_submit_form(self.get(task_url), task_url)
+        if form is None or not form["code_field"]:
+            print("Форма отправки решения не найдена")
+            return None
+
+        fields = dict(form["fields"])
+        fields[form["code_field"]] = code
+        fields["lang"] = lang
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        if form["multipart"]:
+            files = {name: (None, value.encode(self.charset, errors="xmlcharrefreplace"))
+                     for name, value in fields.items()}
+            response = self.session.post(form["action"], files=files, timeout=self.timeout,
+                                         headers={"Referer": task_url})
+        else:
+            body = urlencode(fields, encoding=self.charset, errors="xmlcharrefreplace")
+            response = self.session.post(form["action"], data=body, timeout=self.timeout,
+                                         headers={"Content-Type": "application/x-www-form-urlencoded",
+                                                  "Referer": task_url})
+        response.raise_for_status()
+        return self.decode(response)
+
+    def close(self):
+        self.session.close()
+
+
+def parse_difficulty(page_html):
+    """Сложность задачи в процентах со страницы (None, если не указана)"""
+    match = re.search(r'Сложность:\s*(\d+)\s*%', page_html)
+    return int(match.group(1)) if match else None
+
+
+class TaskCorpus:
+    """Локальный корпус условий задач в SQLite: сжатый task_info, индексы по названию и сложности,
+    ETag/Last-Modified и хэш страницы для условной перезагрузки"""
+
+    def __init__(self, db_file="task_corpus.sqlite"):
+        self.db_file = db_file
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS tasks (
+                                 task_id INTEGER PRIMARY KEY,
+                                 status TEXT NOT NULL,
+                                 title TEXT,
+                                 difficulty INTEGER,
+                                 etag TEXT,
+                                 last_modified TEXT,
+                                 page_hash TEXT,
+                                 fetched_at TEXT NOT NULL,
+                                 info BLOB,
+                                 form TEXT)""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS tasks_title ON tasks(title)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS tasks_difficulty ON tasks(difficulty)")
+        self.conn.commit()
+
+    def _row(self, query, task_id):
+        with self.lock:
+            return self.conn.execute(query, (int(task_id),)).fetchone()
+
+    def get(self, task_id):
+        """Разобранное условие задачи (те же поля, что у parse_task_page) или None"""
+        row = self._row("SELECT info FROM tasks WHERE task_id = ? AND status = 'ok'", task_id)
+        return json.loads(zlib.decompress(row[0]).decode('utf-8')) if row else None
+
+    def form(self, task_id, task_url):
+        """Форма отправки; адрес хранится относительным и собирается от адреса задачи"""
+        row = self._row("SELECT form FROM tasks WHERE task_id = ? AND status = 'ok'", task_id)
+        if not row or not row[0]:
+            return None
+        form = json.loads(row[0])
+        form["action"] = urljoin(task_url, form["action"])
+        return form
+
+    def difficulty(self, task_id):
+        row = self._row("SELECT difficulty FROM tasks WHERE task_id = ?", task_id)
+        return row[0] if row else None
+
+    def validators(self, task_id):
+        """(etag, last_modified, page_hash) сохраненной страницы или None"""
+        return self._row("SELECT etag, last_modified, page_hash FROM tasks WHERE task_id = ?", task_id)
+
+    def put(self, task_id, task_info, difficulty=None, form=None, etag=None, last_modified=None, page_hash=None):
+        info = zlib.compress(json.dumps(task_info, ensure_ascii=False).encode('utf-8'))
+        if form:
+            action = urlparse(form["action"])
+            form = dict(form, action=action.path + (f"?{action.query}" if action.query else ""))
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO tasks VALUES (?, 'ok', ?, ?, ?, ?, ?, ?, ?, ?)",
+                              (int(task_id), task_info["title"], difficulty, etag, last_modified, page_hash,
+                               datetime.now().isoformat(), info, json.dumps(form) if form else None))
+
+    def mark_missing(self, task_id):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO tasks (task_id, status, fetched_at) VALUES (?, 'missing', ?)",
+                              (int(task_id), datetime.now().isoformat()))
+
+    def touch(self, task_id):
+        """Страница не изменилась - обновляем только время проверки"""
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE tasks SET fetched_at = ? WHERE task_id = ?",
+                              (datetime.now().isoformat(), int(task_id)))
+
+    def missing_ids(self):
+        with self.lock:
+            return {row[0] for row in self.conn.execute("SELECT task_id FROM tasks WHERE status = 'missing'")}
+
+    def find(self, title=None, min_difficulty=None, max_difficulty=None):
+        """Поиск по индексу: подстрока названия и диапазон сложности -> [(task_id, title, difficulty)]"""
+        query = "SELECT task_id, title, difficulty FROM tasks WHERE status = 'ok'"
+        params = []
+        if title:
+            query += " AND title LIKE ?"
+            params.append(f"%{title}%")
+        if min_difficulty is not None:
+            query += " AND difficulty >= ?"
+            params.append(min_difficulty)
+        if max_difficulty is not None:
+            query += " AND difficulty <= ?"
+            params.append(max_difficulty)
+        with self.lock:
+            return self.conn.execute(query + " ORDER BY task_id", params).fetchall()
+
+    def summary(self):
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status"))
+
+    def close(self):
+        self.conn.close()
+
+
+def crawl_task_corpus(corpus, site_url, task_range, cookies=None, user_agent=None, workers=8,
+                      rate_limiter=None, refresh=False):
+    """Параллельно загружаем условия задач диапазона в корпус; страницы без изменений
+    (304 или тот же хэш) повторно не разбираются"""
+    local = threading.local()
+    transports = []
+    transports_lock = threading.Lock()
+
+    def transport():
+        # requests.Session не рассчитана на несколько потоков - своя сессия на поток
+        if not hasattr(local, "http"):
+            local.http = ACMPHttpTransport(site_url, cookies, user_agent, pool_size=2, rate_limiter=rate_limiter)
+            with transports_lock:
+                transports.append(local.http)
+        return local.http
+
+    def crawl_one(task_id):
+        task_url = f"{site_url}/index.asp?main=task&id_task={task_id}"
+        known = corpus.validators(task_id)
+        etag, last_modified, page_hash = (None if refresh else known) or (None, None, None)
+        try:
+            page_html, etag, last_modified = transport().get_conditional(task_url, etag, last_modified)
+        except Exception as e:
+            print(f"Ошибка загрузки задачи {task_id}: {e}")
+            return "errors"
+        if page_html is None:
+            corpus.touch(task_id)
+            return "unchanged"
+        if "ошибка" in page_html.lower():
+            corpus.mark_missing(task_id)
+            return "missing"
+        new_hash = content_hash(page_html)
+        if new_hash == page_hash:
+            corpus.touch(task_id)
+            return "unchanged"
+        tree = lxml_html.fromstring(page_html)
+        corpus.put(task_id, parse_task_html(tree), parse_difficulty(page_html), parse_submit_form(tree, task_url),
+                   etag, last_modified, new_hash)
+        return "updated" if known else "new"
+
+    first_task, last_task = task_range
+    task_ids = list(range(first_task, last_task + 1))
+    stats = {"new": 0, "updated": 0, "unchanged": 0, "missing": 0, "errors": 0}
+    start = time.time()
+    print(f"Загрузка условий задач {first_task}-{last_task} в {corpus.db_file} ({workers} потоков)...")
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for i, outcome in enumerate(executor.map(crawl_one, task_ids), 1):
+                stats[outcome] += 1
+                if i % 50 == 0:
+                    print(f"  {i}/{len(task_ids)}")
+    finally:
+        for http in transports:
+            http.close()
+
+    print(f"Корпус обновлен за {time.time() - start:.1f} с: новых {stats['new']}, обновлено {stats['updated']}, "
+          f"без изменений {stats['unchanged']}, нет задачи {stats['missing']}, ошибок {stats['errors']}")
+    return stats
+
+
+PENDING_VERDICT_MARKERS = ("Compiling", "Testing", "Waiting", "Running", "Queue")
+
+
+def is_final_verdict(result_text):
+    return bool(result_text) and not any(marker in result_text for marker in PENDING_VERDICT_MARKERS)
+
+
+class Verdict(Enum):
+    ACCEPTED = "AC"
+    WRONG_ANSWER = "WA"
+    PRESENTATION_ERROR = "PE"
+    TIME_LIMIT = "TLE"
+    MEMORY_LIMIT = "MLE"
+    RUNTIME_ERROR = "RE"
+    COMPILATION_ERROR = "CE"
+    NO_VERDICT = "NONE"
+
+
+VERDICT_PATTERNS = [
+    (Verdict.ACCEPTED, r'accepted|принято'),
+    (Verdict.WRONG_ANSWER, r'wrong answer|неправильный ответ'),
+    (Verdict.PRESENTATION_ERROR, r'presentation error|неверный формат'),
+    (Verdict.TIME_LIMIT, r'time limit|превышен[а-я]* (?:лимит|предел) времени'),
+    (Verdict.MEMORY_LIMIT, r'memory limit|превышен[а-я]* (?:лимит|предел) памяти'),
+    (Verdict.RUNTIME_ERROR, r'runtime error|ошибка (?:выполнения|времени выполнения)'),
+    (Verdict.COMPILATION_ERROR, r'compilation error|ошибка компиляции'),
+]
+
+
+def parse_verdict(result_text):
+    """Вердикт из текста таблицы статусов: (Verdict, номер теста или None)"""
+    text = (result_text or "").lower()
+    test = re.search(r'(?:test|тест[а-я]*)\s*(?:№\s*)?(\d+)', text)
+    for verdict, pattern in VERDICT_PATTERNS:
+        if re.search(pattern, text):
+            return verdict, int(test.group(1)) if test else None
+    return Verdict.NO_VERDICT, None
+
+
+def parse_status_rows(status_html):
+    """Разбираем строки таблицы статусов: id посылки, автор, задача, результат. Номер теста
+    acmp.ru выводит в отдельной колонке "Тест" - он дописывается к результату ("... на тесте N")"""
+    tree = lxml_html.fromstring(status_html) if isinstance(status_html, str) else status_html
+    rows = []
+    for table in tree.xpath("//table[contains(concat(' ', @class, ' '), ' refresh ')]"):
+        headers = [html_text(th).lower() for th in table.xpath(".//tr[th][1]/th")]
+        result_column = headers.index("результат") if "результат" in headers else 5
+        test_column = headers.index("тест") if "тест" in headers else None
+        for row in table.xpath(".//tr[td]"):
+            cells = row.xpath("./td")
+            if len(cells) <= max(5, result_column, test_column or 0):
+                continue
+            author_ids = re.findall(r'id=(\d+)', " ".join(cells[2].xpath(".//a/@href")))
+            task_ids = re.findall(r'id_task=(\d+)', " ".join(cells[3].xpath(".//a/@href")))
+            result = html_text(cells[result_column])
+            test = html_text(cells[test_column]) if test_column is not None else ""
+            if test.isdigit() and parse_verdict(result)[0] not in (Verdict.ACCEPTED, Verdict.NO_VERDICT):
+                result = f"{result} на тесте {test}"
+            rows.append({
+                "id": html_text(cells[0]),
+                "author_id": author_ids[0] if author_ids else None,
+                "author": html_text(cells[2]),
+                "task_id": task_ids[0] if task_ids else html_text(cells[3]),
+                "result": result,
+            })
+    return rows
+
+
+class StatusPoller:
+    """Опрос вердиктов по id посылок: одна загрузка статуса обслуживает все ожидающие посылки,
+    интервал для каждой посылки растет экспоненциально от initial_delay до max_delay"""
+
+    def __init__(self, initial_delay=0.3, max_delay=3.0, factor=1.6, timeout=180):
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.factor = factor
+        self.timeout = timeout
+        self.cond = threading.Condition()
+        self.pending = {}
+        self.results = {}
+        self.fetching = False
+
+    def _next_fetch_at(self):
+        return min((state["next_at"] for submission_id, state in self.pending.items()
+                    if not is_final_verdict(self.results.get(submission_id))), default=time.time())
+
+    def _fetch(self, fetch_status_html):
+        """Загружаем статус один раз для всех ожидающих посылок (вызывается под self.cond)"""
+        self.fetching = True
+        self.cond.release()
+        try:
+            rows = parse_status_rows(fetch_status_html())
+        except Exception as e:
+            print(f"Ошибка проверки статуса: {e}")
+            rows = []
+        finally:
+            self.cond.acquire()
+            self.fetching = False
+
+        now = time.time()
+        for row in rows:
+            if row["id"] in self.pending:
+                self.results[row["id"]] = row["result"]
+        for submission_id, state in self.pending.items():
+            if not is_final_verdict(self.results.get(submission_id)):
+                # Загрузка обслужила все посылки сразу - каждая отодвигает свой следующий опрос
+                state["delay"] = min(state["delay"] * self.factor, self.max_delay)
+                state["next_at"] = now + state["delay"]
+        self.cond.notify_all()
+
+    def wait(self, submission_id, fetch_status_html):
+        """Ждем окончательного вердикта посылки; None - если не дождались"""
+        deadline = time.time() + self.timeout
+        with self.cond:
+            self.pending[submission_id] = {"delay": self.initial_delay,
+                                           "next_at": time.time() + self.initial_delay}
+            try:
+                while True:
+                    result = self.results.get(submission_id)
+                    if is_final_verdict(result):
+                        return result
+                    now = time.time()
+                    if now >= deadline:
+                        return None
+                    next_at = self._next_fetch_at()
+                    if not self.fetching and now >= next_at:
+                        self._fetch(fetch_status_html)
+                    else:
+                        self.cond.wait(timeout=max(0.05, min(next_at, deadline) - now))
+            finally:
+                self.pending.pop(submission_id, None)
+                self.results.pop(submission_id, None)
+
+
+DEFAULT_MODEL = "kwaipilot/kat-coder-pro:free"
+
+SYSTEM_PROMPT = """Ты - эксперт по программированию и решению олимпиадных задач. 
+                        Ты видишь предыдущие попытки решения этой и других задач. 
+                        Анализируй ошибки предыдущих решений и предлагай улучшенный код.
+                        Пиши чистый, эффективный код на Python. 
+                        Код должен читать из input() и выводить через print()."""
+
+# Что просить у модели после вердикта сайта ({on_test} - " на тесте N" или пусто)
+REPAIR_STRATEGIES = {
+    Verdict.WRONG_ANSWER: "Решение дает неверный ответ{on_test}, хотя примеры проходит. Найди логическую ошибку: "
+                          "проверь крайние случаи (минимальные и максимальные значения, равные элементы, "
+                          "одиночный элемент), переполнение и точность вычислений.",
+    Verdict.PRESENTATION_ERROR: "Неверный формат вывода{on_test}. Сверь разделители, переводы строк и число "
+                                "знаков после запятой с примерами.",
+    Verdict.TIME_LIMIT: "Решение превышает лимит времени{on_test}. Оцени сложность алгоритма при максимальных "
+                        "ограничениях ниже и замени его на асимптотически более быстрый; читай ввод через sys.stdin.",
+    Verdict.MEMORY_LIMIT: "Решение превышает лимит памяти{on_test}. Не храни лишние данные целиком, обрабатывай "
+                          "ввод по частям, избегай больших промежуточных списков и глубокой рекурсии.",
+    Verdict.RUNTIME_ERROR: "Решение падает с ошибкой выполнения{on_test}. Проверь разбор ввода (лишние пробелы, "
+                           "пустые строки, все числа в одной строке), деление на ноль, выход за границы списков "
+                           "и глубину рекурсии.",
+    Verdict.COMPILATION_ERROR: "Решение не компилируется. Исправь синтаксис и используй только стандартную "
+                               "библиотеку Python 3.",
+}
+
+
+class DriverCrashedError(Exception):
+    """Браузер или chromedriver перестал отвечать - сессию нужно перезапустить"""
+
+
+class LLMUnavailableError(Exception):
+    """Ни одна из моделей не ответила - решение не отправляется"""
+
+
+def load_model_specs(value=None):
+    """Список моделей: None - модель по умолчанию, путь к JSON файлу со списком
+    {"name", "max_concurrency", "timeout", "prompt_price", "completion_price", "max_cost"}
+    или имена через запятую. Цены - в долларах за миллион токенов, max_cost - бюджет на прогон"""
+    if not value:
+        entries = [DEFAULT_MODEL]
+    elif os.path.exists(value):
+        with open(value, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+    else:
+        entries = [name.strip() for name in value.split(",") if name.strip()]
+    specs = []
+    for entry in entries:
+        spec = {"name": entry} if isinstance(entry, str) else dict(entry)
+        spec.setdefault("max_concurrency", 4)
+        spec.setdefault("timeout", 180)
+        spec.setdefault("prompt_price", 0.0)
+        spec.setdefault("completion_price", 0.0)
+        spec.setdefault("max_cost", None)
+        specs.append(spec)
+    return specs
+
+
+class ModelRouter:
+    """Выбор модели для запроса: Thompson sampling по доле Accepted, деленной на цену попытки
+    (секунды ответа + деньги, переведенные в секунды через money_weight). Модели после 429/5xx
+    временно исключаются, модели с исчерпанным бюджетом - до конца прогона. Статистика хранится в stats_file"""
+
+    STAT_KEYS = ("calls", "errors", "seconds", "prompt_tokens", "completion_tokens", "cost", "accepted", "rejected")
+
+    def __init__(self, specs, stats_file="model_stats.json", money_weight=3600.0):
+        self.specs = {spec["name"]: spec for spec in specs}
+        self.stats_file = stats_file
+        self.money_weight = money_weight
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.cooldown_until = {}
+        self.run_cost = {}
+        self.answer_models = {}
+        self.stats = {}
+        if stats_file and os.path.exists(stats_file):
+            try:
+                with open(stats_file, 'r', encoding='utf-8') as f:
+                    self.stats = json.load(f)
+            except Exception as e:
+                print(f"Ошибка загрузки статистики моделей: {e}")
+        for name in self.specs:
+            self.stats.setdefault(name, {})
+            for key in self.STAT_KEYS:
+                self.stats[name].setdefault(key, 0)
+
+    def usable(self, name, now):
+        spec = self.specs[name]
+        over_budget = spec["max_cost"] is not None and self.run_cost.get(name, 0.0) >= spec["max_cost"]
+        return not over_budget and self.cooldown_until.get(name, 0) <= now
+
+    def score(self, name):
+        """Случайная оценка Accepted в секунду попытки"""
+        stats = self.stats[name]
+        acceptance = random.betavariate(stats["accepted"] + 1, stats["rejected"] + 1)
+        calls = max(stats["calls"], 1)
+        seconds = stats["seconds"] / calls if stats["calls"] else 30.0
+        return acceptance / (seconds + self.money_weight * stats["cost"] / calls)
+
+    def choose(self, exclude=()):
+        """Модель для следующего запроса; None - все доступные уже опробованы или на паузе"""
+        now = time.time()
+        with self.lock:
+            candidates = [name for name in self.specs if name not in exclude and self.usable(name, now)]
+            if not candidates:
+                return None
+            return max(candidates, key=self.score)
+
+    def wait_time(self, exclude=()):
+        """Через сколько секунд освободится хотя бы одна модель (None - ждать нечего)"""
+        now = time.time()
+        with self.lock:
+            waits = [self.cooldown_until.get(name, 0) - now for name, spec in self.specs.items()
+                     if name not in exclude and (spec["max_cost"] is None
+                                                 or self.run_cost.get(name, 0.0) < spec["max_cost"])]
+        return max(0.0, min(waits)) if waits else None
+
+    def cooldown(self, name, seconds):
+        with self.lock:
+            self.cooldown_until[name] = max(self.cooldown_until.get(name, 0), time.time() + seconds)
+            self.stats[name]["errors"] += 1
+
+    def record_call(self, name, seconds, prompt_tokens=0, completion_tokens=0):
+        spec = self.specs[name]
+        cost = (prompt_tokens * spec["prompt_price"] + completion_tokens * spec["completion_price"]) / 1e6
+        with self.lock:
+            stats = self.stats[name]
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+            stats["cost"] += cost
+            self.run_cost[name] = self.run_cost.get(name, 0.0) + cost
+
+    def remember_answer(self, answer, name):
+        """Запоминаем, какая модель написала код, чтобы потом засчитать ей вердикт"""
+        with self.lock:
+            self.answer_models[content_hash(extract_code(answer))] = name
+            if len(self.answer_models) > 10000:
+                self.answer_models.pop(next(iter(self.answer_models)))
+
+    def record_outcome(self, code, accepted):
+        """Вердикт по коду (локальная проверка или сайт) засчитывается написавшей его модели"""
+        with self.lock:
+            name = self.answer_models.get(content_hash(code))
+            if name is None or name not in self.stats:
+                return
+            self.stats[name]["accepted" if accepted else "rejected"] += 1
+        self.save()
+
+    def save(self):
+        if not self.stats_file:
+            return
+        with self.lock:
+            data = json.loads(json.dumps(self.stats))
+        try:
+            with self.save_lock:
+                atomic_write_json(self.stats_file, data)
+        except Exception as e:
+            print(f"Ошибка сохранения статистики моделей: {e}")
+
+    def report(self):
+        print("\nМодели:")
+        with self.lock:
+            for name in self.specs:
+                stats = self.stats[name]
+                tokens = stats["prompt_tokens"] + stats["completion_tokens"]
+                print(f"  {name}: запросов {stats['calls']}, ошибок {stats['errors']}, "
+                      f"Accepted {stats['accepted']}/{stats['accepted'] + stats['rejected']}, "
+                      f"Accepted/час {stats['accepted'] / max(stats['seconds'], 1e-9) * 3600:.1f}, "
+                      f"Accepted/1M токенов {stats['accepted'] / max(tokens, 1) * 1e6:.1f}, "
+                      f"${stats['cost']:.4f}")
+
+
+# Подсказки для кандидатов турнира (первый кандидат - без подсказки)
+CANDIDATE_HINTS = [
+    "",
+    "Перед кодом кратко разбери крайние случаи из ограничений.",
+    "Предпочти самое простое и прямолинейное решение.",
+    "Выбери решение с наилучшей асимптотикой по времени.",
+]
+
+
+class CodeFenceParser:
+    """Инкрементальный разбор потока ответа модели по строкам: готово, как только закрылся
+    блок ```python (тот же, что потом достанет extract_code)"""
+
+    def __init__(self):
+        self.text = ""
+        self.scanned = 0
+        self.open_lang = None
+        self.done = False
+
+    def feed(self, chunk):
+        """Добавляем кусок ответа; True - код получен, остальное можно не читать"""
+        self.text += chunk
+        while not self.done:
+            newline = self.text.find("\n", self.scanned)
+            if newline == -1:
+                break
+            line = self.text[self.scanned:newline].strip()
+            self.scanned = newline + 1
+            if self.open_lang is None:
+                if line.startswith("```"):
+                    self.open_lang = line[3:].strip().lower()
+            elif line.endswith("```"):
+                self.done = self.open_lang == "python"
+                self.open_lang = None
+        return self.done
+
+    def answer(self):
+        """Текст ответа до закрывающей строки блока кода (или весь, если блок не закрылся)"""
+        return self.text[:self.scanned] if self.done else self.text
+
+
+class AsyncLLMClient:
+    """Асинхронный клиент LLM (AsyncOpenAI) в фоновом цикле событий: модель для каждого запроса
+    выбирает ModelRouter, при 429/5xx запрос сразу уходит другой модели. В потоковом режиме
+    генерация прерывается, как только пришел блок кода"""
+
+    def __init__(self, api_key, base_url="https://openrouter.ai/api/v1", extra_headers=None,
+                 router=None, max_concurrency=4, max_retries=5, cache=None, stream=True):
+        self.router = router or ModelRouter(load_model_specs(), stats_file=None)
+        self.cache = cache
+        self.extra_headers = extra_headers or {}
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.stream = stream
+        self.client = AsyncOpenAI(base_url=base_url, api_key=api_key, max_retries=0)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.semaphore, self.model_semaphores = asyncio.run_coroutine_threadsafe(
+            self._make_semaphores(), self.loop).result()
+
+    async def _make_semaphores(self):
+        return asyncio.Semaphore(self.max_concurrency), {
+            name: asyncio.Semaphore(spec["max_concurrency"]) for name, spec in self.router.specs.items()}
+
+    @staticmethod
+    def _retry_after(error, retry):
+        """Пауза для модели: заголовок Retry-After или экспоненциальная задержка с джиттером"""
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                return float(response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                pass
+        return min(60.0, 2 ** retry) + random.random()
+
+    async def _complete(self, messages, temperature=None, usage=None, use_cache=True):
+        """use_cache=False - повторный запрос, которому нужен новый ответ: из кэша не читаем"""
+        cache_key = content_hash(sorted(self.router.specs), messages, temperature)
+        if self.cache and use_cache:
+            cached = self.cache.get("llm", cache_key)
+            if cached is not None:
+                self.router.remember_answer(cached["answer"], cached["model"])
+                return cached["answer"]
+        answer, model = await self._request(messages, temperature, usage)
+        self.router.remember_answer(answer, model)
+        if self.cache and answer:
+            self.cache.put("llm", cache_key, {"answer": answer, "model": model})
+        return answer
+
+    async def _request(self, messages, temperature=None, usage=None):
+        """Запрос к выбранной роутером модели; (ответ, модель)"""
+        tried = set()
+        error = None
+        for retry in range(self.max_retries + 1):
+            model = self.router.choose(tried)
+            if model is None:
+                # Все модели опробованы или на паузе - ждем ближайшую и пробуем снова
+                delay = self.router.wait_time()
+                if delay is None:
+                    break
+                tried.clear()
+                print(f"Все модели недоступны, повтор через {delay:.1f} с")
+                await asyncio.sleep(delay)
+                model = self.router.choose(tried)
+                if model is None:
+                    continue
+            tried.add(model)
+            spec = self.router.specs[model]
+            try:
+                async with self.semaphore, self.model_semaphores[model]:
+                    params = {"model": model, "messages": messages, "extra_headers": self.extra_headers,
+                              "timeout": spec["timeout"]}
+                    if temperature is not None:
+                        params["temperature"] = temperature
+                    start = time.perf_counter()
+                    if self.stream:
+                        params["stream"] = True
+                        params["stream_options"] = {"include_usage": True}
+                        answer, prompt_tokens, completion_tokens = await self._read_stream(
+                            await self.client.chat.completions.create(**params), messages)
+                    else:
+                        completion = await self.client.chat.completions.create(**params)
+                        answer = completion.choices[0].message.content
+                        prompt_tokens = completion.usage.prompt_tokens if completion.usage else 0
+                        completion_tokens = completion.usage.completion_tokens if completion.usage else 0
+                    self.router.record_call(model, time.perf_counter() - start, prompt_tokens, completion_tokens)
+                    if usage is not None:
+                        usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + prompt_tokens
+                        usage["completion_tokens"] = usage.get("completion_tokens", 0) + completion_tokens
+                    if not answer:
+                        raise LLMUnavailableError(f"{model}: пустой ответ")
+                    return answer, model
+            except (RateLimitError, APIConnectionError, APITimeoutError, LLMUnavailableError) as e:
+                error = e
+            except APIStatusError as e:
+                if e.status_code in (402, 404):
+                    # Нет кредитов или модели - до конца прогона запросы идут другим моделям
+                    self.router.cooldown(model, 24 * 3600)
+                    print(f"Модель {model} отключена: {e.status_code}")
+                    error = e
+                    continue
+                if e.status_code < 500:
+                    raise
+                error = e
+            delay = self._retry_after(error, retry)
+            self.router.cooldown(model, delay)
+            print(f"Модель {model} недоступна ({type(error).__name__}), пауза {delay:.1f} с, пробуем другую")
+        raise LLMUnavailableError(f"нет ответа ни от одной модели: {error}")
+
+    @staticmethod
+    async def _read_stream(stream, messages):
+        """Читаем поток до закрытия блока кода и закрываем соединение - остаток не генерируется.
+        (ответ, токены запроса, токены ответа); без usage в потоке токены оцениваются по тексту"""
+        parser = CodeFenceParser()
+        usage = None
+        try:
+            async for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content and parser.feed(chunk.choices[0].delta.content):
+                    break
+        finally:
+            await stream.close()
+        answer = parser.answer()
+        if usage:
+            return answer, usage.prompt_tokens, usage.completion_tokens
+        return answer, estimate_tokens("".join(message["content"] for message in messages)), estimate_tokens(answer)
+
+    async def _complete_many(self, messages, n, usage=None, use_cache=True):
+        """n кандидатов: разная температура и подсказка о подходе для разнообразия решений"""
+        temperatures = [None] if n == 1 else [round(0.2 + 0.8 * i / (n - 1), 2) for i in range(n)]
+        variants = []
+        for i in range(n):
+            hint = CANDIDATE_HINTS[i % len(CANDIDATE_HINTS)]
+            variants.append(messages if not hint else
+                            messages[:-1] + [dict(messages[-1], content=f"{messages[-1]['content']}\n\n{hint}")])
+        results = await asyncio.gather(*[self._complete(variant, temperature, usage, use_cache)
+                                         for variant, temperature in zip(variants, temperatures)],
+                                       return_exceptions=True)
+        answers = [result for result in results if not isinstance(result, BaseException)]
+        if not answers:
+            raise results[0]
+        return answers
+
+    def submit(self, messages, n=1, usage=None, use_cache=True):
+        """Запускаем генерацию n кандидатов параллельно; возвращаем Future со списком ответов.
+        usage - словарь, в который складывается расход токенов"""
+        return asyncio.run_coroutine_threadsafe(self._complete_many(messages, n, usage, use_cache), self.loop)
+
+    def complete(self, messages, usage=None, use_cache=True):
+        return self.submit(messages, usage=usage, use_cache=use_cache).result()[0]
+
+    def close(self):
+        try:
+            asyncio.run_coroutine_threadsafe(self.client.close(), self.loop).result(timeout=5)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+
+class TaskPrefetcher:
+    """Заранее загружает и разбирает следующие задачи и запускает для них генерацию решения,
+    пока текущая задача проверяется; очередь подготовленных задач ограничена depth"""
+
+    def __init__(self, solver, tasks, depth=2):
+        self.solver = solver
+        self.tasks = tasks
+        self.queue = queue.Queue(maxsize=depth)
+        self.stopped = threading.Event()
+        # Отдельная HTTP сессия: requests.Session не рассчитана на несколько потоков
+        self.http = ACMPHttpTransport(solver.site_url, solver.auth_cookies,
+                                      solver.http.session.headers.get("User-Agent"),
+                                      rate_limiter=solver.rate_limiter)
+        self.thread = threading.Thread(target=self._produce, daemon=True)
+        self.thread.start()
+
+    def _produce(self):
+        for task_id, task_url in self.tasks:
+            if self.stopped.is_set():
+                break
+            prepared = {"task_info": None, "pending": None, "usage": {}}
+            try:
+                prepared["task_info"] = self._load(task_id, task_url)
+                if prepared["task_info"]:
+                    prompt = self.solver.build_task_prompt(prepared["task_info"])
+                    prepared["pending"] = self.solver.ask_ai_async(prompt, task_id, self.solver.candidates,
+                                                                   usage=prepared["usage"])
+            except Exception as e:
+                print(f"Ошибка предзагрузки задачи {task_id}: {e}")
+            while not self.stopped.is_set():
+                try:
+                    self.queue.put((task_id, task_url, prepared), timeout=1)
+                    break
+                except queue.Full:
+                    continue
+        self.queue.put(None)
+
+    def _load(self, task_id, task_url):
+        task_info = self.solver.corpus_task(task_id, task_url, self.solver.http)
+        if task_info is not None:
+            return task_info
+        cached = self.solver.cache.get("task", task_id) if self.solver.cache else None
+        if cached is not None:
+            return cached["task_info"]
+        page_html = self.http.get(task_url)
+        if "ошибка" in page_html.lower():
+            return None
+        tree = lxml_html.fromstring(page_html)
+        form = parse_submit_form(tree, task_url)
+        if form:
+            # Форма нужна сессии, которая отправляет решение, иначе submit загрузит страницу еще раз
+            self.solver.http.forms[task_url] = form
+        return self.solver.cached_parse(task_id, page_html, lambda: parse_task_html(tree))
+
+    def __iter__(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            yield item
+
+    def close(self):
+        self.stopped.set()
+        self.http.close()
+
+
+def estimate_tokens(text):
+    """Грубая оценка числа токенов (около 4 символов на токен)"""
+    return len(text) // 4 + 1
+
+
+class SolutionIndex:
+    """Инвертированный TF-IDF индекс по условиям и коду решенных задач, пополняется по мере решения"""
+
+    def __init__(self):
+        self.postings = {}
+        self.doc_lengths = {}
+
+    @staticmethod
+    def tokenize(text):
+        return [token for token in re.findall(r'\w+', text.lower()) if len(token) > 1 and not token.isdigit()]
+
+    def add(self, task_id, text):
+        task_id = str(task_id)
+        if task_id in self.doc_lengths:
+            self.remove(task_id)
+        counts = {}
+        for token in self.tokenize(text):
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            self.postings.setdefault(token, {})[task_id] = count
+        self.doc_lengths[task_id] = sum(counts.values()) or 1
+
+    def remove(self, task_id):
+        for token in list(self.postings):
+            docs = self.postings[token]
+            docs.pop(task_id, None)
+            if not docs:
+                del self.postings[token]
+        self.doc_lengths.pop(task_id, None)
+
+    def search(self, text, k=3, exclude=None):
+        """k самых похожих задач: [(task_id, score)]"""
+        total = len(self.doc_lengths)
+        if not total:
+            return []
+        query = {}
+        for token in self.tokenize(text):
+            query[token] = query.get(token, 0) + 1
+        scores = {}
+        for token, query_count in query.items():
+            docs = self.postings.get(token)
+            if not docs:
+                continue
+            idf = math.log(1 + total / len(docs))
+            for task_id, count in docs.items():
+                scores[task_id] = scores.get(task_id, 0.0) + query_count * count * idf * idf
+        ranked = sorted(((score / math.sqrt(self.doc_lengths[task_id]), task_id)
+                         for task_id, score in scores.items() if task_id != exclude), reverse=True)
+        return [(task_id, score) for score, task_id in ranked[:k]]
+
+
+def extract_code(solution):
+    """Достаем код из ответа модели"""
+    code_match = re.search(r'```python\s*(.*?)\s*```', solution, re.DOTALL)
+    if code_match:
+        return code_match.group(1).strip()
+    code_match = re.search(r'```\s*(.*?)\s*```', solution, re.DOTALL)
+    if code_match:
+        return code_match.group(1).strip()
+    return solution.strip()
+
+
+class _NameNormalizer(ast.NodeTransformer):
+    """Переименовывает пользовательские имена в v0, v1, ... в порядке появления"""
+
+    def __init__(self):
+        self.names = {}
+
+    def rename(self, name):
+        if name in self.names:
+            return self.names[name]
+        if hasattr(builtins, name):
+            return name
+        self.names[name] = f"v{len(self.names)}"
+        return self.names[name]
+
+    def visit_Name(self, node):
+        node.id = self.rename(node.id)
+        return node
+
+    def visit_arg(self, node):
+        node.arg = self.rename(node.arg)
+        node.annotation = None
+        return node
+
+    def visit_FunctionDef(self, node):
+        node.name = self.rename(node.name)
+        return self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node):
+        node.name = self.rename(node.name)
+        return self.generic_visit(node)
+
+    def visit_Expr(self, node):
+        # Строки-комментарии (docstring) на логику не влияют
+        if isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+            return None
+        return self.generic_visit(node)
+
+
+def code_fingerprint(code):
+    """Отпечаток решения: хэш AST без комментариев, форматирования и с обезличенными именами.
+    Код с синтаксической ошибкой - хэш текста без пробелов"""
+    try:
+        tree = _NameNormalizer().visit(ast.parse(code))
+        normalized = ast.dump(tree, annotate_fields=False, include_attributes=False)
+    except (SyntaxError, ValueError, RecursionError):
+        normalized = re.sub(r'\s+', '', code)
+    return content_hash(normalized)
+
+
+def outputs_match(actual, expected):
+    """Сравнение вывода по токенам (пробелы и переводы строк не важны)"""
+    return actual.split() == expected.split()
+
+
+class VerdictMemo:
+    """Индекс отпечатков кода (code_fingerprint) всех попыток с известным вердиктом:
+    по задаче - отпечаток -> вердикт. Поиск O(1)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_task = {}
+
+    @staticmethod
+    def is_known(entry):
+        """Посылки с вердиктом сайта (не прошедшие примеры локально сюда не попадают - лучшего
+        из них все равно отправляют, примеры могут допускать несколько ответов)"""
+        if entry.get("status") == "Accepted":
+            return True
+        return entry.get("status") == "Failed" and parse_verdict(entry.get("result"))[0] is not Verdict.NO_VERDICT
+
+    def add(self, task_id, entry):
+        """Добавляем попытку; отпечаток сохраняется в записи. Возвращаем запись для хранилища
+        отпечатков [task_id, отпечаток, статус, вердикт] или None, если вердикт неизвестен"""
+        if not self.is_known(entry):
+            return None
+        fingerprint = entry.get("fingerprint") or code_fingerprint(entry.get("code", ""))
+        entry["fingerprint"] = fingerprint
+        verdict = [str(task_id), fingerprint, entry.get("status"), entry.get("result", "")]
+        self.remember(*verdict)
+        return verdict
+
+    def remember(self, task_id, fingerprint, status, result):
+        """Добавляем уже посчитанный отпечаток (из хранилища), код не разбираем"""
+        with self.lock:
+            self.by_task.setdefault(str(task_id), {})[fingerprint] = {"status": status, "result": result}
+
+    def lookup(self, task_id, code):
+        """Известный вердикт этого кода по задаче ({'status', 'result'}) или None"""
+        with self.lock:
+            return self.by_task.get(str(task_id), {}).get(code_fingerprint(code))
+
+    def rejected_count(self, task_id):
+        """Сколько разных решений задачи уже отвергнуто сайтом"""
+        with self.lock:
+            return sum(1 for known in self.by_task.get(str(task_id), {}).values() if known["status"] != "Accepted")
+
+    def size(self):
+        with self.lock:
+            return sum(len(fingerprints) for fingerprints in self.by_task.values())
+
+
+# Лимиты решения ставит сам запущенный интерпретатор и затем exec-ом заменяется решением:
+# preexec_fn небезопасен в процессе с потоками (LLM, предзагрузка, пул) - потомок может
+# зависнуть между fork и exec
+LIMITS_RUNNER = """
+import os, resource, sys
+cpu, memory = int(sys.argv[1]), int(sys.argv[2])
+resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+os.execv(sys.executable, [sys.executable, "-I", "solution.py"])
+"""
+
+
+class LocalJudge:
+    """Локальная проверка решения на примерах из условия в отдельном процессе с лимитами"""
+
+    def __init__(self, time_limit=5.0, memory_limit_mb=512):
+        self.time_limit = time_limit
+        self.memory_limit_mb = memory_limit_mb
+
+    def command(self):
+        """Запуск решения; на POSIX - через LIMITS_RUNNER с лимитами времени и адресного пространства"""
+        if os.name != "posix":
+            return [sys.executable, "-I", "solution.py"]
+        return [sys.executable, "-I", "-c", LIMITS_RUNNER, str(int(self.time_limit) + 1),
+                str(self.memory_limit_mb * 1024 * 1024)]
+
+    def run(self, code, input_text):
+        """Запускаем решение на одном вводе: {'verdict', 'output', 'error', 'time'}"""
+        with tempfile.TemporaryDirectory() as work_dir:
+            with open(os.path.join(work_dir, "solution.py"), 'w', encoding='utf-8') as f:
+                f.write(code)
+            # На ACMP решение может читать как stdin, так и INPUT.TXT
+            with open(os.path.join(work_dir, "INPUT.TXT"), 'w', encoding='utf-8') as f:
+                f.write(input_text)
+
+            start = time.perf_counter()
+            try:
+                process = subprocess.run(
+                    self.command(), cwd=work_dir, input=input_text,
+                    capture_output=True, text=True, encoding='utf-8', errors='replace', timeout=self.time_limit,
+                )
+            except subprocess.TimeoutExpired:
+                return {"verdict": "TLE", "output": "", "error": "", "time": time.perf_counter() - start}
+            elapsed = time.perf_counter() - start
+
+            output = process.stdout
+            output_file = os.path.join(work_dir, "OUTPUT.TXT")
+            if not output.strip() and os.path.exists(output_file):
+                with open(output_file, 'r', encoding='utf-8', errors='replace') as f:
+                    output = f.read()
+
+        if process.returncode != 0:
+            if "MemoryError" in process.stderr:
+                verdict = "MLE"
+            elif process.returncode < 0:
+                verdict = "TLE"
+            else:
+                verdict = "RE"
+            return {"verdict": verdict, "output": output, "error": process.stderr[-1000:], "time": elapsed}
+        return {"verdict": "OK", "output": output, "error": "", "time": elapsed}
+
+    def evaluate(self, code, tests):
+        """Прогон по примерам: {'passed', 'time' (суммарное время), 'report'}"""
+        passed = 0
+        total_time = 0.0
+        report = []
+        for i, test in enumerate(tests, 1):
+            result = self.run(code, test["input"])
+            total_time += result["time"]
+            if result["verdict"] == "OK" and outputs_match(result["output"], test["output"]):
+                passed += 1
+                continue
+            if result["verdict"] == "OK":
+                report.append(f"Пример {i}: неверный ответ.\nВвод:\n{test['input'][:300]}"
+                              f"Ожидалось:\n{test['output'][:300]}\nПолучено:\n{result['output'][:300]}")
+            elif result["verdict"] == "RE":
+                report.append(f"Пример {i}: ошибка выполнения:\n{result['error']}")
+            else:
+                report.append(f"Пример {i}: {result['verdict']} (лимит {self.time_limit} с, "
+                              f"{self.memory_limit_mb} Мб)")
+        return {"passed": passed, "time": total_time, "report": "\n\n".join(report)}
+
+    def rank(self, codes, tests, workers=4):
+        """Турнир кандидатов: дубликаты по отпечатку AST отбрасываются, остальные прогоняются
+        параллельно (каждый запуск - отдельный процесс) и сортируются по числу пройденных
+        примеров, затем по времени"""
+        unique = {}
+        for code in codes:
+            unique.setdefault(code_fingerprint(code), code)
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(unique)))) as executor:
+            results = list(executor.map(lambda code: dict(self.evaluate(code, tests), code=code), unique.values()))
+        return sorted(results, key=lambda result: (-result["passed"], result["time"]))
+
+
+BOUND_NUMBER = r'((?:\d+[·*x×])?\d+\^\d+|\d+)'
+
+
+def parse_number(text):
+    """Число из ограничения: 100000, 10^5, 2·10^5"""
+    match = re.fullmatch(r'(?:(\d+)[·*x×])?(\d+)\^(\d+)', text)
+    if match:
+        return int(match.group(1) or 1) * int(match.group(2)) ** min(int(match.group(3)), 30)
+    return int(text)
+
+
+def parse_bound_limits(bounds):
+    """Верхние границы из предложений с ограничениями: ({имя: предел} в порядке упоминания,
+    общий предел значений вида "не превосходят 10^9" или None)"""
+    variables = {}
+    values = None
+    for sentence in bounds:
+        text = re.sub(r'\s+', '', sentence)
+        for names, number in re.findall(r'([A-Za-z]\w*(?:,[A-Za-z]\w*)*)\|?(?:≤|<=|<)' + BOUND_NUMBER, text):
+            for name in names.split(","):
+                variables[name] = max(variables.get(name, 0), parse_number(number))
+        for number in re.findall(r'(?:непревосход[а-я]*|неболее|небольше|непревышает)' + BOUND_NUMBER, text):
+            values = max(values or 0, parse_number(number))
+    return variables, values
+
+
+def parse_limits(page_text):
+    """Лимиты со страницы задачи: {'time_limit': секунды, 'memory_limit': Мб} (что нашлось)"""
+    limits = {}
+    match = re.search(r'Время:\s*(\d+(?:[.,]\d+)?)\s*сек', page_text)
+    if match:
+        limits["time_limit"] = float(match.group(1).replace(",", "."))
+    match = re.search(r'Память:\s*(\d+)\s*Мб', page_text)
+    if match:
+        limits["memory_limit"] = int(match.group(1))
+    return limits
+
+
+# Запуск решения для стресс-теста. Замер идет из маленького промежуточного процесса: ru_maxrss
+# наследуется через fork/exec, и у прямого потомка большого процесса-родителя пик памяти был бы
+# не меньше памяти родителя
+STRESS_RUNNER = """
+import json, os, resource, sys
+cpu, memory = int(sys.argv[1]), int(sys.argv[2])
+pid = os.fork()
+if pid == 0:
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    os.dup2(os.open(os.devnull, os.O_WRONLY), 1)
+    os.execv(sys.executable, [sys.executable, "-I", "solution.py"])
+_, status, usage = os.wait4(pid, 0)
+print(json.dumps({"status": os.waitstatus_to_exitcode(status), "cpu": usage.ru_utime + usage.ru_stime,
+                  "rss": usage.ru_maxrss}))
+"""
+
+
+class StressTester:
+    """Стресс-тест перед отправкой: по первому примеру и ограничениям из условия строим случайный
+    ввод максимального размера, меряем процессорное время и пиковую память (wait4) и по двум
+    размерам экстраполируем время до полного. Предсказывает TLE/MLE (только POSIX)"""
+
+    def __init__(self, slack=1.5, max_tokens=200000, workers=4, time_limit=1.0, memory_limit=16):
+        self.slack = slack
+        self.max_tokens = max_tokens
+        self.workers = workers
+        self.time_limit = time_limit
+        self.memory_limit = memory_limit
+        self.lock = threading.Lock()
+        self._baseline = None
+
+    @staticmethod
+    def random_token(token, limit):
+        """Случайное значение того же вида, что и токен примера"""
+        if re.fullmatch(r'-?\d+', token):
+            low = -limit if token.startswith("-") else int(token != "0")
+            return str(random.randint(low, max(low, limit)))
+        if re.fullmatch(r'-?\d+\.\d+', token):
+            low = -limit if token.startswith("-") else 0
+            return f"{random.uniform(low, limit):.{len(token.split('.')[1])}f}"
+        return "".join(random.choice(token) for _ in range(len(token)))
+
+    def input_builder(self, task_info):
+        """(функция размер -> ввод, максимальный размер или None для ввода постоянного размера);
+        None - формат ввода по примеру не распознан"""
+        tests = task_info.get("example_tests") or []
+        if not tests:
+            return None
+        lines = [line.split() for line in tests[0]["input"].strip().split("\n")]
+        if not lines[0]:
+            return None
+        variables, values = parse_bound_limits(extract_bounds(task_info.get("input_data", "")))
+        # Однобуквенные переменные (N, M, k) - размеры, остальные (a_i, ai) и "не превосходят X" - значения
+        sizes = [limit for name, limit in variables.items() if len(name) == 1 and limit <= 10 ** 7]
+        value_limit = max([limit for name, limit in variables.items() if len(name) > 1] + [values or 0]) or 10 ** 9
+        first = lines[0]
+
+        if len(first) == 1 and first[0].isdigit() and len(lines) > 1 and sizes:
+            count = int(first[0])
+            rows = lines[1:]
+            if len(rows) == 1 and len(rows[0]) == count > 0:
+                # N и N чисел в одной строке
+                sample = rows[0]
+                return (lambda size: f"{size}\n" + " ".join(
+                            self.random_token(sample[i % count], value_limit) for i in range(size)) + "\n",
+                        sizes[0])
+            if len(rows) == count > 0 and len({len(row) for row in rows}) == 1:
+                # N строк одинакового вида
+                sample = rows[0]
+                return (lambda size: f"{size // len(sample)}\n" + "".join(
+                            " ".join(self.random_token(token, value_limit) for token in sample) + "\n"
+                            for _ in range(size // len(sample))),
+                        sizes[0] * len(sample))
+            return None
+
+        if len(lines) == 1 and all(re.fullmatch(r'-?\d+', token) for token in first):
+            # Несколько чисел в строке: размер ввода постоянный, берем максимальные значения
+            if len(first) == len(variables):
+                limits = list(variables.values())
+            elif len(first) == 1 and (values or sizes):
+                limits = [values or sizes[0]]
+            else:
+                return None
+            return (lambda size: " ".join(self.random_token(token, limit)
+                                          for token, limit in zip(first, limits)) + "\n", None)
+
+        if len(lines) == 1 and len(first) == 1 and (values or sizes):
+            # Одна строка-слово: длина по ограничению
+            alphabet = first[0]
+            return (lambda size: "".join(random.choice(alphabet) for _ in range(size)) + "\n",
+                    min(values or sizes[0], 10 ** 7))
+        return None
+
+    def measure(self, code, input_text, cpu_limit, wall_limit=None):
+        """Запуск с лимитами через STRESS_RUNNER: {'verdict', 'cpu' (с), 'rss_mb', 'error'}"""
+        wall_limit = wall_limit or cpu_limit * 2 + 1
+        memory = max(512, self.memory_limit * 16) * 1024 * 1024
+        with tempfile.TemporaryDirectory() as work_dir:
+            with open(os.path.join(work_dir, "solution.py"), 'w', encoding='utf-8') as f:
+                f.write(code)
+            input_path = os.path.join(work_dir, "INPUT.TXT")
+            with open(input_path, 'w', encoding='utf-8') as f:
+                f.write(input_text)
+            error_path = os.path.join(work_dir, "stderr.txt")
+            with open(input_path, 'rb') as stdin, open(error_path, 'wb') as stderr:
+                process = subprocess.Popen(
+                    [sys.executable, "-I", "-c", STRESS_RUNNER, str(int(math.ceil(cpu_limit)) + 1), str(memory)],
+                    cwd=work_dir, stdin=stdin, stdout=subprocess.PIPE, stderr=stderr, start_new_session=True)
+                try:
+                    output, _ = process.communicate(timeout=wall_limit)
+                except subprocess.TimeoutExpired:
+                    # Процесс, который ждет, а не считает, RLIMIT_CPU не остановит - убиваем всю группу
+                    os.killpg(process.pid, 9)
+                    output, _ = process.communicate()
+            with open(error_path, 'r', encoding='utf-8', errors='replace') as f:
+                error = f.read()[-500:]
+
+        try:
+            usage = json.loads(output)
+        except ValueError:
+            usage = {"status": -9, "cpu": wall_limit, "rss": 0}
+        cpu = usage["cpu"]
+        rss_mb = usage["rss"] / 1024 / (1024 if sys.platform == "darwin" else 1)
+        if usage["status"] == 0:
+            verdict = "OK"
+        elif "MemoryError" in error:
+            verdict = "MLE"
+        elif usage["status"] < 0 or cpu >= cpu_limit:
+            verdict = "TLE"
+        else:
+            verdict = "RE"
+        return {"verdict": verdict, "cpu": cpu, "rss_mb": rss_mb, "error": error}
+
+    def baseline(self):
+        """Время и память запуска пустой программы (с промежуточным процессом) - вычитаются из замеров"""
+        with self.lock:
+            if self._baseline is None:
+                result = self.measure("pass\n", "", 5)
+                self._baseline = (result["cpu"], result["rss_mb"])
+            return self._baseline
+
+    def check(self, code, task_info):
+        """{'verdict': OK/TLE/MLE/RE, 'estimate' (с), 'memory' (Мб), 'report'}; None - ввод не построить"""
+        if os.name != "posix":
+            return None
+        builder = self.input_builder(task_info)
+        if builder is None:
+            return None
+        build, max_size = builder
+        time_limit = task_info.get("time_limit") or self.time_limit
+        memory_limit = task_info.get("memory_limit") or self.memory_limit
+        cpu_limit = time_limit * self.slack
+        base_cpu, base_rss = self.baseline()
+
+        size = min(max_size, self.max_tokens) if max_size else None
+        small = None
+        if size and size >= 8:
+            # Для четверти размера хватает доли лимита: дольше - TLE уже при линейном росте
+            small = self.measure(code, build(size // 4), cpu_limit, cpu_limit * (size // 4) / max_size + 1)
+            small_cpu = max(0.0, small["cpu"] - base_cpu)
+            linear = small_cpu * max_size / (size // 4)
+            # Даже при линейном росте полный размер не уложится - второй запуск не нужен
+            if small["verdict"] != "OK" or linear > cpu_limit:
+                return self._result(small, linear, max(0.0, small["rss_mb"] - base_rss), size // 4, max_size,
+                                    time_limit, memory_limit)
+        result = self.measure(code, build(size or 1), cpu_limit)
+        estimate = max(0.0, result["cpu"] - base_cpu)
+        memory = max(0.0, result["rss_mb"] - base_rss)
+        if result["verdict"] == "OK" and size and size < max_size:
+            # Показатель роста по двум размерам; на коротких замерах шум больше сигнала - считаем рост линейным
+            exponent = 1.0
+            if small_cpu >= 0.05:
+                exponent = min(3.0, max(1.0, math.log(max(estimate, small_cpu) / small_cpu) / math.log(4)))
+            estimate *= (max_size / size) ** exponent
+            memory *= max_size / size
+        return self._result(result, estimate, memory, size, max_size, time_limit, memory_limit)
+
+    def _result(self, result, estimate, memory, size, max_size, time_limit, memory_limit):
+        verdict = result["verdict"]
+        if verdict == "OK" and estimate > time_limit * self.slack:
+            verdict = "TLE"
+        elif verdict == "OK" and memory > memory_limit * self.slack:
+            verdict = "MLE"
+        scale = f"размер {size}" + (f" из {max_size}" if size != max_size else "") if size else "максимальные значения"
+        report = (f"Стресс-тест ({scale}): {verdict}, оценка времени {estimate:.2f} с при лимите {time_limit} с, "
+                  f"память {max(0.0, memory):.0f} Мб при лимите {memory_limit} Мб")
+        if verdict == "RE":
+            report += f"\n{result['error']}"
+        return {"verdict": verdict, "estimate": estimate, "memory": memory, "report": report}
+
+    def check_many(self, codes, task_info):
+        """Кандидаты проверяются параллельно, каждый запуск - отдельный процесс"""
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(codes)))) as executor:
+            return list(executor.map(lambda code: self.check(code, task_info), codes))
+
+
+# Что не грузим в экономном режиме: картинки, шрифты и сторонние счетчики/аналитика
+LEAN_BLOCKED_URLS = [
+    "*.gif", "*.png", "*.jpg", "*.jpeg", "*.ico", "*.svg", "*.webp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*mc.yandex.ru*", "*top.mail.ru*", "*top-fwz1.mail.ru*", "*counter.yadro.ru*", "*liveinternet.ru*",
+]
+
+
+def bound_magnitude(bounds):
+    """Наибольшее число в ограничениях (10^9, 2·10^5, 100000); 0 - чисел нет"""
+    magnitude = 0
+    for bound in bounds:
+        text = bound.replace(" ", "")
+        for base, exponent in re.findall(r'(\d+)\^(\d+)', text):
+            if int(exponent) < 100:
+                magnitude = max(magnitude, int(base) ** int(exponent))
+        for number in re.findall(r'(?<![\d^])\d+(?![\d^])', text):
+            magnitude = max(magnitude, int(number))
+    return magnitude
+
+
+class TaskScheduler:
+    """Порядок задач и бюджет попыток по оценке вероятности решения: сначала дешевые и вероятные,
+    безнадежные - во второй проход с одной попыткой. Решения планировщика пишутся в log_file"""
+
+    def __init__(self, solver, log_file="schedule_log.jsonl", hopeless=0.15, neighbour_window=15):
+        self.solver = solver
+        self.log_file = log_file
+        self.hopeless = hopeless
+        self.neighbour_window = neighbour_window
+
+    def task_features(self, task_id):
+        """Признаки задачи из корпуса и истории - без загрузки страниц"""
+        features = {"difficulty": None, "length": None, "magnitude": None,
+                    "rejected": self.solver.verdict_memo.rejected_count(task_id)}
+        task_info = self.solver.corpus.get(task_id) if self.solver.corpus else None
+        if task_info is not None:
+            features["length"] = len(task_info["full_description"])
+            features["magnitude"] = bound_magnitude(extract_bounds(task_info.get("input_data", "")))
+            features["difficulty"] = self.solver.corpus.difficulty(task_id)
+        return features
+
+    def neighbour_rate(self, task_id, attempted, accepted):
+        """Доля принятых среди уже решавшихся задач с близкими номерами (сглаженная)"""
+        task_id = int(task_id)
+        tried = solved = 0
+        for other in range(task_id - self.neighbour_window, task_id + self.neighbour_window + 1):
+            if other != task_id and other in attempted:
+                tried += 1
+                solved += other in accepted
+        return (solved + 1) / (tried + 2)
+
+    def estimate(self, task_id, features, attempted, accepted):
+        """Оценка вероятности Accepted и относительной стоимости попытки"""
+        probability = self.neighbour_rate(task_id, attempted, accepted)
+        if features["difficulty"] is not None:
+            probability = 0.4 * probability + 0.6 * (1 - features["difficulty"] / 100)
+        if features["magnitude"] and features["magnitude"] >= 10 ** 5:
+            # Большие ограничения - выше риск TLE у решения на Python
+            probability *= 0.85 if features["magnitude"] < 10 ** 9 else 0.75
+        if features["length"]:
+            probability /= 1 + max(0, features["length"] - 1500) / 3000
+        probability *= 0.6 ** features["rejected"]
+        cost = 1 + (features["length"] or 1500) / 2000
+        return probability, cost
+
+    def retry_budget(self, probability):
+        if probability >= 0.5:
+            return 3
+        if probability >= 0.3:
+            return 2
+        return 1
+
+    def plan(self, tasks, deferred_pass=False):
+        """(задачи этого прохода по убыванию вероятности на единицу стоимости, отложенные задачи);
+        бюджет попыток записывается в solver.retry_budget"""
+        attempted = {int(task_id) for task_id in self.solver.store.task_ids() if str(task_id).isdigit()}
+        accepted = {int(task_id) for task_id in self.solver.best_solutions if str(task_id).isdigit()}
+        scored = []
+        for task_id, task_url in tasks:
+            features = self.task_features(task_id)
+            probability, cost = self.estimate(task_id, features, attempted, accepted)
+            scored.append((probability / cost, probability, features, task_id, task_url))
+        scored.sort(key=lambda item: -item[0])
+
+        run, deferred = [], []
+        with open(self.log_file, 'a', encoding='utf-8') as log:
+            for order, (value, probability, features, task_id, task_url) in enumerate(scored, 1):
+                hopeless = probability < self.hopeless and not deferred_pass
+                budget = 1 if deferred_pass else self.retry_budget(probability)
+                if hopeless:
+                    deferred.append((task_id, task_url))
+                else:
+                    run.append((task_id, task_url))
+                    self.solver.retry_budget[task_id] = budget
+                log.write(json.dumps({"time": datetime.now().isoformat(), "task_id": task_id,
+                                      "pass": 2 if deferred_pass else 1, "order": order,
+                                      "probability": round(probability, 3), "value": round(value, 3),
+                                      "decision": "defer" if hopeless else "run",
+                                      "max_attempts": None if hopeless else budget,
+                                      "features": features}, ensure_ascii=False) + "\n")
+        print(f"Планировщик: {len(run)} задач в работу, {len(deferred)} отложено "
+              f"(решения записаны в {self.log_file})")
+        return run, deferred
+
+
 class ACMPSolverBrowser:
-    def __init__(self, openrouter_api_key=None, site_url="https://acmp.ru", site_name="ACMP Solver"):
+    def __init__(self, openrouter_api_key=None, site_url="https://acmp.ru", site_name="ACMP Solver",
+                 storage="jsonl", parent=None, transport="browser", prejudge=True, max_local_retries=2,
+                 candidates=1, llm_base_url="https://openrouter.ai/api/v1", llm_concurrency=4, cache=None,
+                 retry_exhausted=False, context_k=3, context_token_budget=1500, trace_file="run_trace.jsonl",
+                 site_rps=2.0, browser="headed", worker_browser="lean", user_data_dir=None,
+                 task_range=(555, 1000), corpus=None, models=None, model_stats_file="model_stats.json",
+                 llm_stream=True, schedule=True, schedule_log="schedule_log.jsonl", time_budget=None,
+                 token_budget=None, stress=True, stress_slack=1.5, session_file="acmp_session.json"):
         self.openrouter_api_key = openrouter_api_key
         self.site_url = site_url
         self.site_name = site_name
-        self.solutions_file = "solutions_history.json"
-        self.best_solutions_file = "best_solutions.json"
-        
-        # Загружаем историю решений
-        self.solutions_history = self.load_solutions_history()
-        self.best_solutions = self.load_best_solutions()
-        
-        if openrouter_api_key:
-            self.client = OpenAI(
-                base_url="https://openrouter.ai/api/v1",
-                api_key=openrouter_api_key,
-            )
+        self.transport = transport
+        self.http = None
+        self.user_id = None
+        self.user_name = None
+        # Наибольший id посылки в таблице статусов перед отправкой решения задачи
+        self.submission_floors = {}
+        self.local_judge = LocalJudge() if prejudge else None
+        self.stress_tester = StressTester(stress_slack, workers=candidates) if prejudge and stress else None
+        self.max_local_retries = max_local_retries
+        self.candidates = candidates
+        self.context_k = context_k
+        self.context_token_budget = context_token_budget
+        self.auth_cookies = []
+        self.is_worker = parent is not None
+        self.browser = browser
+        self.worker_browser = worker_browser
+        self.user_data_dir = user_data_dir
+        self.task_range = task_range
+        self.max_driver_restarts = 2
+        self.driver_restarts = 0
+
+        if parent is not None:
+            # Рабочая сессия пула: общие хранилище, история и клиент, свой браузер
+            self.store = parent.store
+            self.history_lock = parent.history_lock
+            self.solutions_file = parent.solutions_file
+            self.best_solutions_file = parent.best_solutions_file
+            self.solutions_history = parent.solutions_history
+            self.best_solutions = parent.best_solutions
+            self.client = parent.client
+            self.status_poller = parent.status_poller
+            self.cache = parent.cache
+            self.corpus = parent.corpus
+            self.manifest = parent.manifest
+            self.retry_exhausted = parent.retry_exhausted
+            self.solution_index = parent.solution_index
+            self.verdict_memo = parent.verdict_memo
+            self.retry_budget = parent.retry_budget
+            self.time_budget = parent.time_budget
+            self.token_budget = parent.token_budget
+            self.scheduler = None
+            self.session = None
+            self.prompt_sizes = parent.prompt_sizes
+            self.tracer = parent.tracer
+            self.rate_limiter = parent.rate_limiter
         else:
-            self.client = None
+            self.store = STORAGE_BACKENDS[storage]()
+            self.history_lock = threading.RLock()
+            migrated = migrate_json_history(self.store)
+            self.status_poller = StatusPoller()
+            self.cache = cache
+            self.corpus = corpus
+            self.manifest = RunManifest()
+            self.retry_exhausted = retry_exhausted
+            self.prompt_sizes = []
+            self.tracer = RunTracer(trace_file)
+            self.rate_limiter = RateLimiter(site_rps, burst=max(1, int(site_rps * 2)))
+            self.solutions_file = getattr(self.store, "history_file", None) or self.store.db_file
+            self.best_solutions_file = getattr(self.store, "best_file", None) or self.store.db_file
+
+            # Загружаем историю решений (с диска читается только индекс)
+            self.solutions_history = self.load_solutions_history()
+            self.best_solutions = self.load_best_solutions()
+            self.solution_index = self.build_solution_index()
+            self.verdict_memo = self.build_verdict_memo(rebuild=migrated > 0)
+            self.retry_budget = {}
+            self.time_budget = time_budget
+            self.token_budget = token_budget
+            self.scheduler = TaskScheduler(self, schedule_log) if schedule else None
+            self.session = SessionStore(session_file) if session_file else None
+
+            if openrouter_api_key:
+                self.client = AsyncLLMClient(
+                    openrouter_api_key,
+                    base_url=llm_base_url,
+                    extra_headers={"HTTP-Referer": self.site_url, "X-Title": self.site_name},
+                    router=ModelRouter(models or load_model_specs(), model_stats_file),
+                    max_concurrency=llm_concurrency,
+                    cache=cache,
+                    stream=llm_stream,
+                )
+            else:
+                self.client = None
+
+        self.driver = self.create_driver(browser, user_data_dir)
+        self.wait = WebDriverWait(self.driver, 20)
 
+    def open_page(self, url, ready_locator=None, timeout=20):
+        """Открываем страницу с учетом лимита запросов и ждем готовности DOM вместо фиксированной паузы"""
+        if self.driver is None:
+            return
+        self.rate_limiter.acquire()
+        with self.tracer.span("page_load"):
+            self.driver.get(url)
+            self.wait_page_ready(ready_locator, timeout)
+
+    def wait_page_ready(self, ready_locator=None, timeout=20):
+        """Ждем document.readyState и (если задан) появления конкретного элемента"""
+        wait = WebDriverWait(self.driver, timeout)
+        wait.until(lambda driver: driver.execute_script("return document.readyState") in ("interactive", "complete"))
+        if ready_locator:
+            try:
+                wait.until(EC.presence_of_element_located(ready_locator))
+            except Exception:
+                pass
+
+    def create_driver(self, browser="headed", user_data_dir=None):
+        """Запускаем Chrome: headed - обычное окно (для ручного входа), lean - headless без картинок и шрифтов,
+        none - без браузера (только HTTP транспорт)"""
+        if browser == "none":
+            return None
         chrome_options = Options()
-        chrome_options.add_argument("--start-maximized")
         chrome_options.add_argument("--disable-infobars")
         chrome_options.add_argument("--disable-extensions")
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option('useAutomationExtension', False)
         chrome_options.add_argument("--ignore-certificate-errors")
         chrome_options.add_argument("--ignore-ssl-errors")
+        if user_data_dir:
+            # Постоянный профиль: вход на сайт переживает перезапуск
+            chrome_options.add_argument(f"--user-data-dir={os.path.abspath(user_data_dir)}")
+
+        if browser == "lean":
+            chrome_options.add_argument("--headless=new")
+            chrome_options.add_argument("--window-size=1280,900")
+            chrome_options.add_argument("--disable-gpu")
+            chrome_options.add_argument("--mute-audio")
+            chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+            chrome_options.add_experimental_option("prefs", {
+                "profile.managed_default_content_settings.images": 2,
+            })
+            chrome_options.page_load_strategy = "eager"
+        else:
+            chrome_options.add_argument("--start-maximized")
 
-        self.driver = webdriver.Chrome(options=chrome_options)
-        self.wait = WebDriverWait(self.driver, 20)
+        driver = webdriver.Chrome(options=chrome_options)
+        if browser == "lean":
+            try:
+                driver.execute_cdp_cmd("Network.enable", {})
+                driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": LEAN_BLOCKED_URLS})
+            except Exception as e:
+                print(f"Не удалось включить блокировку ресурсов: {e}")
+        return driver
+
+    def spawn_worker(self):
+        """Создаем дополнительную браузерную сессию с общей историей и куками авторизации"""
+        worker = ACMPSolverBrowser(self.openrouter_api_key, self.site_url, self.site_name, parent=self,
+                                   transport=self.transport, prejudge=self.local_judge is not None,
+                                   max_local_retries=self.max_local_retries, candidates=self.candidates,
+                                   context_k=self.context_k, context_token_budget=self.context_token_budget,
+                                   browser=self.worker_browser if self.browser != "none" else "none",
+                                   task_range=self.task_range, stress=self.stress_tester is not None,
+                                   stress_slack=self.stress_tester.slack if self.stress_tester else 1.5)
+        worker.apply_cookies(self.auth_cookies)
+        worker.user_id, worker.user_name = self.user_id, self.user_name
+        if self.http:
+            worker.enable_http_transport()
+        return worker
+
+    def enable_http_transport(self):
+        """Включаем HTTP транспорт на куках авторизованного браузера"""
+        if not self.auth_cookies:
+            self.capture_cookies()
+        try:
+            user_agent = self.driver.execute_script("return navigator.userAgent") if self.driver else None
+        except Exception:
+            user_agent = None
+        self.http = ACMPHttpTransport(self.site_url, self.auth_cookies, user_agent, rate_limiter=self.rate_limiter)
+
+    def capture_cookies(self):
+        """Запоминаем куки авторизованной сессии"""
+        if self.driver is not None:
+            self.auth_cookies = self.driver.get_cookies()
+        elif self.http is not None:
+            self.auth_cookies = [dict({"name": cookie.name, "value": cookie.value, "domain": cookie.domain,
+                                       "path": cookie.path}, **({"expiry": cookie.expires} if cookie.expires else {}))
+                                 for cookie in self.http.session.cookies]
+        return self.auth_cookies
+
+    def apply_cookies(self, cookies):
+        """Переносим куки авторизации в текущий браузер (и HTTP сессию, если она уже есть)"""
+        self.auth_cookies = cookies
+        if self.http is not None:
+            self.http.load_cookies(cookies)
+        if self.driver is None:
+            return
+        self.open_page(self.site_url)
+        for cookie in cookies:
+            cookie = {key: value for key, value in cookie.items() if key != "sameSite"}
+            try:
+                self.driver.add_cookie(cookie)
+            except Exception as e:
+                print(f"Не удалось установить куку {cookie.get('name')}: {e}")
 
     def load_solutions_history(self):
-        """Загружаем историю решений из JSON файла"""
-        if os.path.exists(self.solutions_file):
-            try:
-                with open(self.solutions_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
+        """Представление истории решений поверх хранилища"""
+        return SolutionHistoryView(self.store)
 
     def load_best_solutions(self):
-        """Загружаем лучшие решения из JSON файла"""
-        if os.path.exists(self.best_solutions_file):
-            try:
-                with open(self.best_solutions_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
-
-    def save_solutions_history(self):
-        """Сохраняем историю решений в JSON файл"""
+        """Загружаем лучшие решения из хранилища"""
         try:
-            with open(self.solutions_file, 'w', encoding='utf-8') as f:
-                json.dump(self.solutions_history, f, ensure_ascii=False, indent=2)
+            return self.store.load_best()
         except Exception as e:
-            print(f"Ошибка сохранения истории решений: {e}")
+            print(f"Ошибка загрузки лучших решений: {e}")
+            return {}
 
-    def save_best_solutions(self):
-        """Сохраняем лучшие решения в JSON файл"""
+    def save_solutions_history(self):
+        """Сохраняем индекс истории решений"""
         try:
-            with open(self.best_solutions_file, 'w', encoding='utf-8') as f:
-                json.dump(self.best_solutions, f, ensure_ascii=False, indent=2)
+            self.store.flush()
         except Exception as e:
-            print(f"Ошибка сохранения лучших решений: {e}")
+            print(f"Ошибка сохранения истории решений: {e}")
 
-    def add_solution_to_history(self, task_id, solution_code, attempt_number, status, result_text=""):
+    def build_solution_index(self):
+        """Индексируем условия и код уже решенных задач"""
+        index = SolutionIndex()
+        for task_id, solution_data in self.best_solutions.items():
+            index.add(task_id, f"{solution_data.get('statement', '')}\n{solution_data.get('code', '')}")
+        return index
+
+    def build_verdict_memo(self, rebuild=False):
+        """Индекс отпечатков из хранилища: читаем только сохраненные отпечатки, сами попытки не разбираем.
+        rebuild - в историю только что перенесены попытки без отпечатков"""
+        start = time.perf_counter()
+        memo = VerdictMemo()
+        verdicts = None if rebuild else self.store.load_verdicts()
+        if verdicts is None:
+            # История старого формата или только что перенесенная: код разбирается один раз,
+            # отпечатки сохраняются рядом с историей
+            verdicts = []
+            for task_id in self.store.task_ids():
+                for entry in self.store.get_attempts(task_id):
+                    verdict = memo.add(task_id, entry)
+                    if verdict is not None:
+                        verdicts.append(verdict)
+            self.store.save_verdicts(verdicts)
+        else:
+            for verdict in verdicts:
+                memo.remember(*verdict)
+        if memo.size():
+            print(f"Индекс отпечатков решений: {memo.size()} за {time.perf_counter() - start:.2f} с")
+        return memo
+
+    def add_solution_to_history(self, task_id, solution_code, attempt_number, status, result_text="",
+                                statement=""):
         """Добавляем решение в историю"""
-        if str(task_id) not in self.solutions_history:
-            self.solutions_history[str(task_id)] = []
-        
+        with self.history_lock:
+            self._add_solution_to_history(task_id, solution_code, attempt_number, status, result_text, statement)
+
+    def _add_solution_to_history(self, task_id, solution_code, attempt_number, status, result_text, statement):
         solution_entry = {
             "timestamp": datetime.now().isoformat(),
             "attempt": attempt_number,
@@ -95,13 +2642,19 @@ class ACMPSolverBrowser:
             "result": result_text,
             "is_accepted": status == "Accepted"
         }
-        
-        self.solutions_history[str(task_id)].append(solution_entry)
-        self.save_solutions_history()
+        verdict = self.verdict_memo.add(task_id, solution_entry)
+
+        try:
+            self.store.append_attempt(task_id, solution_entry)
+            if verdict is not None:
+                self.store.append_verdict(*verdict)
+        except Exception as e:
+            print(f"Ошибка сохранения попытки: {e}")
         
         # Проверяем, является ли это решение лучшим (Accepted)
         if status == "Accepted":
-            self.update_best_solution(task_id, solution_code, solution_entry)
+            best_entry = dict(solution_entry, statement=statement) if statement else solution_entry
+            self.update_best_solution(task_id, solution_code, best_entry)
 
     def update_best_solution(self, task_id, solution_code, solution_entry):
         """Обновляем лучшее решение для задачи"""
@@ -109,7 +2662,7 @@ class ACMPSolverBrowser:
         
         if task_id_str not in self.best_solutions:
             self.best_solutions[task_id_str] = solution_entry
-            self.save_best_solutions()
+            self.save_best_solution(task_id_str)
             return
         
         # Проверяем, нужно ли обновить лучшее решение
@@ -120,38 +2673,73 @@ class ACMPSolverBrowser:
         # Если новое решение принято и оно более новое, обновляем
         if solution_entry["is_accepted"] and new_time > current_time:
             self.best_solutions[task_id_str] = solution_entry
-            self.save_best_solutions()
+            self.save_best_solution(task_id_str)
 
-    def get_previous_solutions_prompt(self, task_id):
+    def save_best_solution(self, task_id_str):
+        """Дописываем лучшее решение задачи в хранилище и индекс похожих задач"""
+        solution_data = self.best_solutions[task_id_str]
+        self.solution_index.add(task_id_str, f"{solution_data.get('statement', '')}\n{solution_data.get('code', '')}")
+        try:
+            self.store.save_best(task_id_str, self.best_solutions[task_id_str])
+        except Exception as e:
+            print(f"Ошибка сохранения лучших решений: {e}")
+
+    def get_previous_solutions_prompt(self, task_id, query=""):
         """Формируем промт с предыдущими решениями"""
+        with self.history_lock:
+            return self._get_previous_solutions_prompt(task_id, query)
+
+    def _get_previous_solutions_prompt(self, task_id, query):
         task_id_str = str(task_id)
-        prompt_parts = []
-        
-        # Добавляем лучшие решения из других задач
-        if self.best_solutions:
-            prompt_parts.append("УЧАСТКИ КОДА ИЗ ДРУГИХ РЕШЕННЫХ ЗАДАЧ:")
-            for other_task_id, solution_data in self.best_solutions.items():
-                if other_task_id != task_id_str and len(solution_data.get("code", "")) < 500:
-                    prompt_parts.append(f"Задача {other_task_id} (Accepted):")
-                    prompt_parts.append(f"```python\n{solution_data.get('code', '')}\n```\n")
-        
-        # Добавляем предыдущие попытки для текущей задачи
+        budget = self.context_token_budget
+
+        # Предыдущие попытки для текущей задачи - не больше половины бюджета
+        attempt_parts = []
         if task_id_str in self.solutions_history:
-            attempts = self.solutions_history[task_id_str]
-            if attempts:
-                prompt_parts.append(f"\nПРЕДЫДУЩИЕ ПОПЫТКИ ДЛЯ ЗАДАЧИ {task_id}:")
-                for attempt in attempts[-3:]:  # Последние 3 попытки
-                    status = attempt.get("status", "Unknown")
-                    result = attempt.get("result", "")
-                    prompt_parts.append(f"Попытка {attempt.get('attempt', '?')} - {status}: {result}")
-                    prompt_parts.append(f"Код:\n```python\n{attempt.get('code', '')}\n```\n")
-        
+            attempts = self.solutions_history.last(task_id_str, 3)
+            attempts_budget = budget // 2
+            for attempt in reversed(attempts):  # Последние 3 попытки, от новой к старой
+                status = attempt.get("status", "Unknown")
+                result = attempt.get("result", "")
+                part = (f"Попытка {attempt.get('attempt', '?')} - {status}: {result}\n"
+                        f"Код:\n```python\n{attempt.get('code', '')}\n```\n")
+                if estimate_tokens(part) > attempts_budget:
+                    break
+                attempts_budget -= estimate_tokens(part)
+                attempt_parts.insert(0, part)
+            budget -= budget // 2 - attempts_budget
+
+        # Самые похожие решенные задачи в пределах оставшегося бюджета
+        similar_parts = []
+        for other_task_id, _ in self.solution_index.search(query, k=self.context_k, exclude=task_id_str):
+            code = self.best_solutions.get(other_task_id, {}).get("code", "")
+            part = f"Задача {other_task_id} (Accepted):\n```python\n{code}\n```\n"
+            if estimate_tokens(part) > budget:
+                continue
+            budget -= estimate_tokens(part)
+            similar_parts.append(part)
+
+        prompt_parts = []
+        if similar_parts:
+            prompt_parts.append("УЧАСТКИ КОДА ИЗ ПОХОЖИХ РЕШЕННЫХ ЗАДАЧ:")
+            prompt_parts.extend(similar_parts)
+        if attempt_parts:
+            prompt_parts.append(f"\nПРЕДЫДУЩИЕ ПОПЫТКИ ДЛЯ ЗАДАЧИ {task_id}:")
+            prompt_parts.extend(attempt_parts)
+
         return "\n".join(prompt_parts) if prompt_parts else ""
 
-    def ask_ai(self, prompt, task_id):
+    def record_prompt_size(self, task_id, messages):
+        """Запоминаем и печатаем размер запроса к модели"""
+        chars = sum(len(message["content"]) for message in messages)
+        tokens = estimate_tokens("".join(message["content"] for message in messages))
+        self.prompt_sizes.append(tokens)
+        print(f"Размер запроса для задачи {task_id}: {chars} символов (~{tokens} токенов)")
+
+    def ask_ai(self, prompt, task_id, history=True, use_cache=True):
         if not self.client or not self.openrouter_api_key:
             # Получаем предыдущие решения для промта
-            previous_solutions_prompt = self.get_previous_solutions_prompt(task_id)
+            previous_solutions_prompt = self.get_previous_solutions_prompt(task_id, prompt)
             
             # Добавляем в основной промт
             full_prompt = f"{prompt}\n\n{previous_solutions_prompt}"
@@ -182,46 +2770,68 @@ else:
 ```"""
 
         try:
-            # Получаем предыдущие решения для промта
-            previous_solutions_prompt = self.get_previous_solutions_prompt(task_id)
-            
-            # Формируем полный промт с историей решений
-            full_prompt = f"""{prompt}
+            with self.tracer.span("llm"):
+                return self.client.complete(self.build_ai_messages(prompt, task_id, history),
+                                            usage=self.tracer.usage(), use_cache=use_cache)
+        except Exception as e:
+            # Заглушка вместо решения только потратила бы посылку
+            raise LLMUnavailableError(f"Ошибка API: {e}") from e
+
+    def build_ai_messages(self, prompt, task_id, history=True):
+        if not history:
+            # Исправление по вердикту: контекст уже в prompt, история попыток не нужна
+            messages = [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ]
+            self.record_prompt_size(task_id, messages)
+            return messages
+
+        # Получаем предыдущие решения для промта
+        previous_solutions_prompt = self.get_previous_solutions_prompt(task_id, prompt)
+
+        # Формируем полный промт с историей решений
+        full_prompt = f"""{prompt}
 
 ИСТОРИЯ РЕШЕНИЙ:
 {previous_solutions_prompt}
 
 ПРОАНАЛИЗИРУЙ ПРЕДЫДУЩИЕ ПОПЫТКИ И ПРЕДЛОЖИ УЛУЧШЕННОЕ РЕШЕНИЕ."""
-            
-            completion = self.client.chat.completions.create(
-                extra_headers={
-                    "HTTP-Referer": self.site_url,
-                    "X-Title": self.site_name,
-                },
-                model="kwaipilot/kat-coder-pro:free",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """Ты - эксперт по программированию и решению олимпиадных задач. 
-                        Ты видишь предыдущие попытки решения этой и других задач. 
-                        Анализируй ошибки предыдущих решений и предлагай улучшенный код.
-                        Пиши чистый, эффективный код на Python. 
-                        Код должен читать из input() и выводить через print()."""
-                    },
-                    {
-                        "role": "user",
-                        "content": full_prompt
-                    }
-                ],
-            )
-            return completion.choices[0].message.content
+
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": full_prompt},
+        ]
+        self.record_prompt_size(task_id, messages)
+        return messages
+
+    def ask_ai_async(self, prompt, task_id, n=1, usage=None, history=True, use_cache=True):
+        """Запускаем генерацию n кандидатов без ожидания; Future со списком ответов.
+        use_cache=False - для повторных запросов (исправления, просьба о другом решении): тот же
+        промт дал бы из кэша тот же ответ, и попытка ушла бы впустую"""
+        if not self.client or not self.openrouter_api_key:
+            future = Future()
+            future.set_result([self.ask_ai(prompt, task_id, history, use_cache)])
+            return future
+        if usage is None:
+            usage = self.tracer.usage()
+        return self.client.submit(self.build_ai_messages(prompt, task_id, history), n, usage, use_cache)
+
+    def collect_answers(self, pending, prompt, task_id, history=True, use_cache=True):
+        """Дожидаемся кандидатов; при ошибке API - одиночный синхронный запрос"""
+        try:
+            with self.tracer.span("llm"):
+                return pending.result()
+        except LLMUnavailableError:
+            raise
         except Exception as e:
             print(f"Ошибка API: {e}")
-            return f"```python\n# Ошибка API, базовое решение\nprint(input())\n```"
+            return [self.ask_ai(prompt, task_id, history, use_cache)]
 
     def wait_for_authorization(self):
         print("Ожидаем авторизации...")
-        max_wait_time = 300
+        # В headless окне войти вручную нельзя - ждем недолго, вход должен быть в профиле
+        max_wait_time = 300 if self.browser == "headed" else 20
         start_time = time.time()
 
         while time.time() - start_time < max_wait_time:
@@ -233,12 +2843,13 @@ else:
 
                 if user_elements or user_menu:
                     print("Авторизация обнаружена!")
-                    time.sleep(3)
+                    if user_menu:
+                        self.remember_user(user_menu[0])
                     return True
 
                 if "error" in self.driver.current_url.lower() or "ошибка" in self.driver.page_source.lower():
                     print("Обнаружена ошибка страницы, перезагружаем...")
-                    self.driver.get("https://acmp.ru/index.asp?main=tasks")
+                    self.open_page(f"{self.site_url}/index.asp?main=tasks")
 
                 time.sleep(5)
             except Exception as e:
@@ -246,12 +2857,28 @@ else:
                 time.sleep(5)
 
         print("Превышено время ожидания авторизации")
+        if self.browser != "headed":
+            print("Войдите один раз в обычном окне: --browser headed --user-data-dir <каталог профиля>")
         return False
 
+    def remember_user(self, user_link):
+        """Запоминаем id и имя пользователя, чтобы находить свои посылки в таблице статусов"""
+        try:
+            match = re.search(r'id=(\d+)', user_link.get_attribute("href") or "")
+            self.user_id = match.group(1) if match else self.user_id
+            self.user_name = user_link.text.strip() or self.user_name
+        except Exception as e:
+            print(f"Не удалось определить пользователя: {e}")
+
     def get_all_task_urls(self):
         task_urls = []
-        for task_id in range(555, 1001):
-            task_url = f"https://acmp.ru/index.asp?main=task&id_task={task_id}"
+        first_task, last_task = self.task_range
+        # Номера, которых по данным корпуса на сайте нет, не обходим
+        missing = self.corpus.missing_ids() if self.corpus else set()
+        for task_id in range(first_task, last_task + 1):
+            if task_id in missing:
+                continue
+            task_url = f"{self.site_url}/index.asp?main=task&id_task={task_id}"
             task_urls.append(task_url)
         return task_urls
 
@@ -312,35 +2939,18 @@ else:
             pass
 
         examples = ""
+        example_tests = []
         try:
-            example_table = self.driver.find_element(By.XPATH,
-                                                     "//table[.//th[contains(text(), 'INPUT.TXT') or contains(text(), 'OUTPUT.TXT')]]")
+            example_table = self.driver.find_element(By.XPATH, EXAMPLES_TABLE_XPATH)
             examples = example_table.text
+            # Разбираем ячейки из outerHTML за один запрос к драйверу
+            example_tests = parse_example_tests(example_table.get_attribute("outerHTML"))
         except:
             pass
 
-        complete_description = f"""{description}
-
-{full_text}
-
-ВХОДНЫЕ ДАННЫЕ:
-{input_data}
-
-ВЫХОДНЫЕ ДАННЫЕ:
-{output_data}
-
-ПРИМЕРЫ:
-{examples}"""
-
-        return {
-            'title': title,
-            'description': complete_description[:1500] + "..." if len(
-                complete_description) > 1500 else complete_description,
-            'full_description': complete_description,
-            'input_data': input_data,
-            'output_data': output_data,
-            'examples': examples
-        }
+        task_info = build_task_info(title, description, full_text, input_data, output_data, examples, example_tests)
+        task_info.update(parse_limits(self.driver.page_source))
+        return task_info
 
     def set_code_in_codemirror(self, code):
         try:
@@ -378,8 +2988,8 @@ else:
     def submit_solution(self, solution_code):
         try:
             form = self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "form")))
-            self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", form)
-            time.sleep(1)
+            self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", form)
+            self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".CodeMirror")))
 
             if not self.set_code_in_codemirror(solution_code):
                 return False
@@ -389,62 +2999,182 @@ else:
 
             submit_btn = self.wait.until(
                 EC.element_to_be_clickable((By.XPATH, "//input[@type='submit' or @value='Отправить']")))
+            self.rate_limiter.acquire()
             submit_btn.click()
 
-            time.sleep(2)
+            # Ждем ухода со страницы задачи (переход на таблицу статусов)
+            self.wait.until(EC.staleness_of(submit_btn))
+            self.wait_page_ready((By.CLASS_NAME, "refresh"))
             return True
         except Exception as e:
             print(f"Ошибка отправки решения: {e}")
             return False
 
-    def check_solution_status(self, max_attempts=10):
-        for attempt in range(max_attempts):
-            time.sleep(5)
-            try:
-                self.driver.get("https://acmp.ru/index.asp?main=status")
-                time.sleep(2)
-
-                status_table = self.driver.find_element(By.CLASS_NAME, "refresh")
-                rows = status_table.find_elements(By.TAG_NAME, "tr")
-
-                for i, row in enumerate(rows):
-                    if i == 0:
-                        continue
-
-                    cells = row.find_elements(By.TAG_NAME, "td")
-                    if len(cells) >= 6:
-                        author_cell = cells[2]
-                        if "Захаров Илья Николаевич" in author_cell.text:
-                            result_cell = cells[5]
-                            result_text = result_cell.text.strip()
-
-                            if "Accepted" in result_text:
-                                return True, "Accepted"
-                            elif "Compiling" in result_text or "Testing" in result_text:
-                                continue
-                            else:
-                                return False, result_text
-            except Exception as e:
-                print(f"Ошибка проверки статуса: {e}")
+    def status_url(self):
+        """Таблица статусов, отфильтрованная по текущему пользователю"""
+        if self.user_id:
+            return f"{self.site_url}/index.asp?main=status&id_mem={self.user_id}"
+        return f"{self.site_url}/index.asp?main=status"
+
+    def fetch_status_html(self):
+        """Загружаем только HTML статуса, не перезагружая страницу браузера"""
+        if self.http:
+            return self.http.get(self.status_url())
+        self.rate_limiter.acquire()
+        return self.driver.execute_async_script("""
+            var done = arguments[arguments.length - 1];
+            fetch(arguments[0], {credentials: 'include'})
+                .then(function (r) { return r.arrayBuffer(); })
+                .then(function (b) { done(new TextDecoder('windows-1251').decode(b)); })
+                .catch(function () { done(''); });
+        """, self.status_url())
+
+    def latest_submission_id(self):
+        """Наибольший id посылки в таблице статусов (0 - таблица пуста), None - таблица не загрузилась.
+        Id посылок растут, поэтому новая посылка получит id больше этого"""
+        try:
+            ids = [int(row["id"]) for row in parse_status_rows(self.fetch_status_html()) if row["id"].isdigit()]
+        except Exception as e:
+            print(f"Ошибка загрузки таблицы статусов: {e}")
+            return None
+        return max(ids, default=0)
+
+    def find_submission_id(self, status_html, task_id):
+        """Находим id только что отправленной посылки: наша посылка по задаче, появившаяся после отправки
+        (id больше запомненного перед ней). Посылки прошлых запусков не подходят - их вердикт не про этот код"""
+        if not self.user_id and not self.user_name:
+            # Без пользователя своя посылка неотличима от чужих - чужой вердикт хуже, чем никакого
+            print("Пользователь не определен, посылку в таблице статусов не ищем (укажите --user-id)")
+            return None
+        floor = self.submission_floors.get(str(task_id))
+        if floor is None:
+            return None
+        for row in parse_status_rows(status_html):
+            if self.user_id and row["author_id"] != self.user_id:
+                continue
+            if not self.user_id and self.user_name and self.user_name not in row["author"]:
+                continue
+            if str(row["task_id"]) != str(task_id) or not row["id"].isdigit() or int(row["id"]) <= floor:
                 continue
+            return row["id"]
+        return None
 
-        return False, "Timeout"
+    def check_solution_status(self, submission_id=None, task_id=None):
+        with self.tracer.span("judge_wait"):
+            is_accepted, result = self._check_solution_status(submission_id, task_id)
+        self.tracer.verdict(result)
+        return is_accepted, result
 
-    def solve_task_with_retry(self, task_url, task_id, max_attempts=3):
-        for attempt in range(1, max_attempts + 1):
-            print(f"Попытка {attempt} для задачи {task_id}")
+    def _check_solution_status(self, submission_id, task_id):
+        try:
+            if not submission_id:
+                submission_id = self.find_submission_id(self.fetch_status_html(), task_id)
+            if not submission_id:
+                print("Не удалось найти посылку в таблице статусов")
+                return False, "Timeout"
 
+            result_text = self.status_poller.wait(submission_id, self.fetch_status_html)
+        except Exception as e:
+            print(f"Ошибка проверки статуса: {e}")
+            return False, "Timeout"
+
+        if result_text is None:
+            return False, "Timeout"
+        if "Accepted" in result_text:
+            return True, "Accepted"
+        return False, result_text
+
+    def corpus_task(self, task_id, task_url, http=None):
+        """Условие из локального корпуса; форма отправки из корпуса передается HTTP транспорту"""
+        if not self.corpus:
+            return None
+        with self.tracer.span("corpus"):
+            task_info = self.corpus.get(task_id)
+            if task_info is not None and http is not None and task_url not in http.forms:
+                form = self.corpus.form(task_id, task_url)
+                if form:
+                    http.forms[task_url] = form
+        return task_info
+
+    def load_task(self, task_url):
+        """Загружаем и разбираем задачу: корпус, кэш, HTTP транспорт, при ошибке - браузер"""
+        task_id = task_id_from_url(task_url)
+        task_info = self.corpus_task(task_id, task_url, self.http)
+        if task_info is not None:
+            return task_info
+        cached = self.cache.get("task", task_id) if self.cache else None
+        if cached is not None:
+            return cached["task_info"]
+
+        if self.http:
+            try:
+                with self.tracer.span("page_load"):
+                    page_html = self.http.get(task_url)
+                if "ошибка" in page_html.lower():
+                    return None
+                return self.cached_parse(task_id, page_html, lambda: self.http.parse_task(task_url, page_html))
+            except Exception as e:
+                print(f"Ошибка HTTP загрузки задачи, используем браузер: {e}")
+        if self.driver is None:
+            return None
+
+        self.open_page(task_url, (By.TAG_NAME, "h1"))
+
+        page_source = self.driver.page_source
+        if "error" in self.driver.current_url.lower() or "ошибка" in page_source.lower():
+            return None
+
+        return self.cached_parse(task_id, page_source, self.parse_task_page)
+
+    def cached_parse(self, task_id, page_html, parse):
+        """Разбор страницы с кэшем по id задачи и хэшу страницы"""
+        if not self.cache:
+            with self.tracer.span("parse"):
+                return parse()
+        page_hash = content_hash(page_html)
+        task_info = self.cache.get("page", f"{task_id}:{page_hash}")
+        if task_info is None:
+            with self.tracer.span("parse"):
+                task_info = parse()
+            self.cache.put("page", f"{task_id}:{page_hash}", task_info)
+        self.cache.put("task", task_id, {"page_hash": page_hash, "task_info": task_info})
+        return task_info
+
+    def send_solution(self, task_url, task_id, solution_code):
+        """Отправляем решение: HTTP POST формы, при ошибке - через редактор в браузере.
+        Возвращает id посылки ("" - если отправлено, но id не найден) или None при ошибке"""
+        with self.tracer.span("submit"):
+            return self._send_solution(task_url, task_id, solution_code)
+
+    def _send_solution(self, task_url, task_id, solution_code):
+        floor = self.latest_submission_id()
+        if floor is None:
+            # Без id последней посылки новую не отличить от старых - не отправляем вслепую
+            return None
+        self.submission_floors[str(task_id)] = floor
+        if self.http:
             try:
-                self.driver.get(task_url)
-                time.sleep(2)
+                status_html = self.http.submit(task_url, solution_code)
+                if status_html is not None:
+                    return self.find_submission_id(status_html, task_id) or ""
+            except Exception as e:
+                print(f"Ошибка HTTP отправки решения, используем браузер: {e}")
+        if self.driver is None:
+            return None
 
-                if "error" in self.driver.current_url.lower() or "ошибка" in self.driver.page_source.lower():
-                    print("Ошибка загрузки страницы, пробуем снова...")
-                    continue
+        if self.driver.current_url != task_url:
+            # Задача могла быть взята из кэша или загружена по HTTP - открываем ее в браузере
+            self.open_page(task_url, (By.CSS_SELECTOR, ".CodeMirror"))
 
-                task_info = self.parse_task_page()
+        if not self.submit_solution(solution_code):
+            return None
+        try:
+            return self.find_submission_id(self.driver.page_source, task_id) or ""
+        except Exception:
+            return ""
 
-                prompt = f"""Реши задачу на python. Ввод и вывод осуществляй с консоли.
+    def build_task_prompt(self, task_info):
+        return f"""Реши задачу на python. Ввод и вывод осуществляй с консоли.
 
 ЗАГОЛОВОК: {task_info['title']}
 
@@ -460,101 +3190,719 @@ else:
 
 Напиши код на Python, который точно соответствует требованиям задачи."""
 
-                solution = self.ask_ai(prompt, task_id)
+    def build_repair_prompt(self, task_info, repair, tests):
+        """Запрос на исправление по вердикту: условие, текущий код и стратегия под тип ошибки
+        вместо полного промта с кодом прошлых попыток"""
+        verdict, test = repair["verdict"], repair["test"]
+        on_test = f" на тесте {test}" if test else ""
+        sections = [REPAIR_STRATEGIES[verdict].format(on_test=on_test)]
+        if verdict in (Verdict.TIME_LIMIT, Verdict.MEMORY_LIMIT):
+            bounds = extract_bounds(task_info.get('input_data', ""))
+            if bounds:
+                sections.append("ОГРАНИЧЕНИЯ:\n" + "\n".join(bounds))
+        if verdict in (Verdict.COMPILATION_ERROR, Verdict.RUNTIME_ERROR):
+            diagnostics = self.local_diagnostics(repair["code"], tests)
+            if diagnostics:
+                sections.append(f"ЛОКАЛЬНАЯ ПРОВЕРКА:\n{diagnostics[:1500]}")
+
+        return f"""Исправь решение задачи на python. Ввод и вывод осуществляй с консоли.
+
+ЗАГОЛОВОК: {task_info['title']}
 
-                code_match = re.search(r'```python\s*(.*?)\s*```', solution, re.DOTALL)
-                if code_match:
-                    python_code = code_match.group(1).strip()
+ПОЛНОЕ ОПИСАНИЕ:
+{task_info['full_description']}
+
+ТЕКУЩЕЕ РЕШЕНИЕ:
+```python
+{repair['code']}
+```
+
+ВЕРДИКТ: {repair['result']}
+{chr(10).join(sections)}
+{"ЭТО РЕШЕНИЕ УЖЕ ОТПРАВЛЯЛОСЬ РАНЕЕ С ТЕМ ЖЕ ВЕРДИКТОМ - НУЖЕН ДРУГОЙ КОД." if repair.get("duplicate") else ""}
+
+Верни исправленный код целиком."""
+
+    def local_diagnostics(self, code, tests):
+        """Для CE/RE: сначала компилируем и запускаем решение на примерах у себя"""
+        try:
+            compile(code, "solution.py", "exec")
+        except SyntaxError as e:
+            return f"SyntaxError: {e.msg} (строка {e.lineno})"
+        if not tests:
+            return ""
+        with self.tracer.span("prejudge"):
+            return (self.local_judge or LocalJudge()).evaluate(code, tests)["report"]
+
+    def stress_candidates(self, task_info, task_id, attempt, passing):
+        """Стресс-тест прошедших примеры кандидатов. Не уложившиеся в лимиты помечаются (stress_failed)
+        и пишутся в историю; возвращается результат лучшего из них, если уложившихся нет, иначе None"""
+        if not self.stress_tester:
+            return None
+        with self.tracer.span("stress"):
+            checks = self.stress_tester.check_many([result["code"] for result in passing], task_info)
+        slow = None
+        for result, check in zip(passing, checks):
+            if check is None or check["verdict"] not in ("TLE", "MLE"):
+                return None
+            print(check["report"])
+            result["stress_failed"] = True
+            self.add_solution_to_history(task_id, result["code"], attempt, "LocalFailed", check["report"])
+            slow = slow or dict(check, code=result["code"])
+        return slow
+
+    def stress_feedback(self, task_info, slow):
+        """Дополнение к запросу: стратегия TLE/MLE, ограничения условия и замер стресс-теста"""
+        verdict = Verdict.TIME_LIMIT if slow["verdict"] == "TLE" else Verdict.MEMORY_LIMIT
+        sections = [REPAIR_STRATEGIES[verdict].format(on_test=" на максимальном тесте"), slow["report"]]
+        bounds = extract_bounds(task_info.get('input_data', ""))
+        if bounds:
+            sections.append("ОГРАНИЧЕНИЯ:\n" + "\n".join(bounds))
+        return "\n\nПРЕДЫДУЩЕЕ РЕШЕНИЕ ПРОХОДИТ ПРИМЕРЫ, НО НЕ УКЛАДЫВАЕТСЯ В ЛИМИТЫ:\n" + "\n".join(sections)
+
+    def generate_solution(self, task_info, task_id, attempt, pending=None, repair=None):
+        """Запрашиваем решение у модели; не прошедшие примеры локально сразу возвращаем модели.
+        pending - уже запущенная (предзагрузкой) генерация для первой попытки,
+        repair - вердикт сайта на прошлую попытку: тогда просим исправить конкретное решение"""
+        tests = task_info.get('example_tests') or []
+        history = repair is None
+        prompt = self.build_task_prompt(task_info) if history else self.build_repair_prompt(task_info, repair, tests)
+        # Кэш ответов - только для первого запроса по условию; исправления и повторные запросы
+        # с тем же текстом должны получать новый ответ модели
+        use_cache = history
+        if pending is None:
+            pending = self.ask_ai_async(prompt, task_id, self.candidates, history=history, use_cache=use_cache)
+        if not self.local_judge or not tests:
+            return extract_code(self.collect_answers(pending, prompt, task_id, history, use_cache)[0])
+
+        best_code, best_passed = None, -1
+        feedback = ""
+        for local_try in range(self.max_local_retries + 1):
+            if local_try > 0:
+                use_cache = False
+                pending = self.ask_ai_async(prompt + feedback, task_id, self.candidates, history=history,
+                                            use_cache=use_cache)
+            codes = [extract_code(answer)
+                     for answer in self.collect_answers(pending, prompt + feedback, task_id, history, use_cache)]
+            with self.tracer.span("prejudge"):
+                ranked = self.local_judge.rank(codes, tests, workers=self.candidates)
+            if len(codes) > 1:
+                print(f"Кандидатов: {len(codes)}, различных: {len(ranked)}, лучший прошел "
+                      f"{ranked[0]['passed']}/{len(tests)} примеров за {ranked[0]['time']:.2f} с")
+            for result in ranked:
+                if result["passed"] < len(tests):
+                    self.add_solution_to_history(task_id, result["code"], attempt, "LocalFailed",
+                                                 result["report"][:1000])
+                    self.record_model_outcome(result["code"], False)
+            top = ranked[0]
+            if top["passed"] > best_passed:
+                best_code, best_passed = top["code"], top["passed"]
+            if top["passed"] == len(tests):
+                print(f"Решение прошло {top['passed']}/{len(tests)} примеров локально")
+                passing = [result for result in ranked if result["passed"] == len(tests)]
+                slow = self.stress_candidates(task_info, task_id, attempt, passing)
+                if slow is None:
+                    return next(result["code"] for result in passing if not result.get("stress_failed"))
+                print("Решение не укладывается в лимиты на максимальных данных, запрашиваем исправление...")
+                feedback = self.stress_feedback(task_info, slow)
+                continue
+
+            print(f"Решение не прошло примеры локально ({best_passed}/{len(tests)}), запрашиваем исправление...")
+            feedback = f"\n\nПРЕДЫДУЩЕЕ РЕШЕНИЕ НЕ ПРОШЛО ПРИМЕРЫ ИЗ УСЛОВИЯ:\n{top['report'][:2000]}\nИСПРАВЬ ЕГО."
+
+        # Примеры могут допускать несколько верных ответов - отправляем лучшее из кандидатов
+        print("Локальные попытки исчерпаны, отправляем лучшего кандидата")
+        return best_code
+
+    def solve_task_with_retry(self, task_url, task_id, max_attempts=3, prepared=None):
+        repair = None
+        for attempt in range(1, max_attempts + 1):
+            print(f"Попытка {attempt} для задачи {task_id}")
+
+            try:
+                self.check_driver()
+                pending = None
+                if attempt == 1 and prepared and prepared.get("task_info"):
+                    task_info, pending = prepared["task_info"], prepared.get("pending")
                 else:
-                    code_match = re.search(r'```\s*(.*?)\s*```', solution, re.DOTALL)
-                    if code_match:
-                        python_code = code_match.group(1).strip()
-                    else:
-                        python_code = solution.strip()
+                    task_info = self.load_task(task_url)
+
+                if task_info is None:
+                    print("Ошибка загрузки страницы, пробуем снова...")
+                    continue
 
-                success = self.submit_solution(python_code)
+                python_code = self.generate_solution(task_info, task_id, attempt, pending, repair)
+                python_code, known = self.avoid_known_solution(task_info, task_id, attempt, python_code)
+                if known is not None:
+                    # Вердикт этого кода уже известен - посылку не тратим
+                    if known["status"] == "Accepted":
+                        print(f"Задача {task_id}: это решение уже принято")
+                        return True
+                    print(f"Попытка {attempt}: модель повторяет уже отвергнутое решение ({known['result']})")
+                    repair = self.known_repair(python_code, known)
+                    continue
+
+                submission_id = self.send_solution(task_url, task_id, python_code)
+
+                if submission_id is not None:
+                    is_accepted, result = self.check_solution_status(submission_id, task_id)
+                    if is_final_verdict(result) and result != "Timeout":
+                        self.record_model_outcome(python_code, is_accepted)
 
-                if success:
-                    is_accepted, result = self.check_solution_status()
-                    
                     # Сохраняем попытку в историю
                     self.add_solution_to_history(task_id, python_code, attempt, 
                                                "Accepted" if is_accepted else "Failed", 
-                                               result)
+                                               result, f"{task_info['title']}\n{task_info['full_description']}")
                     
                     if is_accepted:
                         print(f"Задача {task_id} решена успешно!")
                         return True
-                    elif attempt < max_attempts:
+                    verdict, test = parse_verdict(result)
+                    # Без распознанного вердикта (таймаут, неизвестный текст) исправлять нечего: следующая
+                    # попытка решает заново, а не чинит код одной из прошлых посылок
+                    repair = ({"code": python_code, "result": result, "verdict": verdict, "test": test}
+                              if verdict in REPAIR_STRATEGIES else None)
+                    if attempt < max_attempts:
                         print(f"Попытка {attempt} не удалась: {result}")
-                        time.sleep(3)
                     else:
                         print(f"Все попытки для задачи {task_id} исчерпаны")
                         return False
-                elif attempt < max_attempts:
-                    print(f"Ошибка отправки, пробуем снова...")
-                    time.sleep(3)
                 else:
-                    return False
+                    # Посылка могла не уйти из-за упавшего браузера - тогда попытку не засчитываем
+                    self.check_driver()
+                    if attempt < max_attempts:
+                        print(f"Ошибка отправки, пробуем снова...")
+                    else:
+                        return False
 
+            except LLMUnavailableError as e:
+                print(f"Модели недоступны, задача {task_id} откладывается: {e}")
+                return None
+            except DriverCrashedError:
+                raise
             except Exception as e:
+                if not self.driver_alive():
+                    # Ошибка из-за упавшего браузера - попытку не засчитываем
+                    raise DriverCrashedError(f"браузер перестал отвечать ({e})")
                 print(f"Ошибка при решении задачи {task_id}: {e}")
-                if attempt < max_attempts:
-                    time.sleep(3)
-                else:
+                if attempt >= max_attempts:
                     return False
 
         return False
 
-    def run_all_tasks(self):
+    def avoid_known_solution(self, task_info, task_id, attempt, python_code):
+        """Перед отправкой ищем код в индексе отпечатков: за уже отвергнутый код просим у модели
+        другое решение (до max_local_retries раз). (код, известный вердикт или None)"""
+        known = self.verdict_memo.lookup(task_id, python_code)
+        for _ in range(self.max_local_retries):
+            if known is None or known["status"] == "Accepted":
+                break
+            print(f"Такое решение уже получило вердикт {known['result']}, просим другое")
+            python_code = self.generate_solution(task_info, task_id, attempt,
+                                                 repair=self.known_repair(python_code, known))
+            known = self.verdict_memo.lookup(task_id, python_code)
+        return python_code, known
+
+    @staticmethod
+    def known_repair(python_code, known):
+        verdict, test = parse_verdict(known["result"])
+        return {"code": python_code, "result": known["result"], "test": test, "duplicate": True,
+                "verdict": verdict if verdict in REPAIR_STRATEGIES else Verdict.WRONG_ANSWER}
+
+    def record_model_outcome(self, code, accepted):
+        """Засчитываем вердикт модели, написавшей код"""
+        if self.client:
+            self.client.router.record_outcome(code, accepted)
+
+    def solve_task(self, task_url, task_id, prepared=None):
+        """Решаем задачу с отметками в манифесте прогона. Если браузер упал, сессия перезапускается
+        и задача решается заново (до max_driver_restarts раз)"""
+        self.manifest.set_state(task_id, "in_progress")
+        solved = None
+        with self.tracer.task(task_id):
+            for _ in range(self.max_driver_restarts + 1):
+                try:
+                    self.check_driver()
+                    solved = self.solve_task_with_retry(task_url, task_id, self.retry_budget.get(task_id, 3),
+                                                        prepared=prepared)
+                    break
+                except DriverCrashedError as e:
+                    print(f"Задача {task_id}: {e}, перезапускаем браузер")
+                    try:
+                        self.restart_driver()
+                    except Exception as e:
+                        print(f"Не удалось перезапустить браузер: {e}")
+                        break
+            if prepared:
+                self.tracer.merge_usage(prepared.get("usage", {}))
+        if solved is None:
+            # Модели не ответили или браузер не поднялся - попытки не потрачены,
+            # задача остается в очереди следующего прогона
+            self.manifest.set_state(task_id, "pending")
+            return False
+        self.manifest.set_state(task_id, "accepted" if solved else "exhausted")
+        return solved
+
+    def has_accepted(self, task_id):
+        best = self.best_solutions.get(str(task_id))
+        return bool(best and best.get("is_accepted"))
+
+    def get_pending_tasks(self):
+        """Задачи для прогона: пропускаем уже принятые и (по умолчанию) исчерпавшие попытки"""
+        tasks = []
+        skipped = 0
+        for task_url in self.get_all_task_urls():
+            task_id = task_id_from_url(task_url)
+            state = self.manifest.state(task_id)
+            if self.has_accepted(task_id) and state != "accepted":
+                self.manifest.set_state(task_id, "accepted")
+                state = "accepted"
+            if state == "accepted" or (state == "exhausted" and not self.retry_exhausted):
+                skipped += 1
+                continue
+            tasks.append((task_id, task_url))
+        if skipped:
+            print(f"Пропускаем уже обработанные задачи: {skipped}")
+        return tasks
+
+    def resubmit_accepted(self):
+        """Повторно отправляем сохраненные Accepted решения без обращения к модели"""
+        resubmitted = 0
+        for task_url in self.get_all_task_urls():
+            task_id = task_id_from_url(task_url)
+            if not self.has_accepted(task_id):
+                continue
+            code = self.best_solutions[str(task_id)]["code"]
+            print(f"\nПовторная отправка решения задачи {task_id}")
+            submission_id = self.send_solution(task_url, task_id, code)
+            if submission_id is None:
+                continue
+            is_accepted, result = self.check_solution_status(submission_id, task_id)
+            self.add_solution_to_history(task_id, code, 0, "Accepted" if is_accepted else "Failed", result)
+            self.manifest.set_state(task_id, "accepted" if is_accepted else "pending")
+            resubmitted += 1
+            print(f"Задача {task_id}: {result}")
+        print(f"Повторно отправлено решений: {resubmitted}")
+
+    def budget_exhausted(self):
+        """Исчерпан ли бюджет прогона по времени или токенам"""
+        if self.time_budget and time.time() - self.tracer.started_at >= self.time_budget:
+            return True
+        if self.token_budget and sum(self.tracer.tokens.values()) >= self.token_budget:
+            return True
+        return False
+
+    def run_tasks(self, tasks, pool=None):
+        """Решаем задачи по порядку (пулом сессий, конвейером или по одной), пока не исчерпан бюджет"""
+        successful_tasks = 0
+        if pool:
+            return pool.run(tasks)
+        # Конвейер работает только с HTTP транспортом и без пула: в браузере страницы грузит
+        # тот же драйвер, что и отправляет решения, и генерация с проверкой не перекрываются
+        if self.http:
+            # Конвейер: следующая задача загружается и решается моделью, пока текущая на проверке
+            prefetcher = TaskPrefetcher(self, tasks)
+            try:
+                for i, (task_id, task_url, prepared) in enumerate(prefetcher, 1):
+                    if self.budget_exhausted():
+                        break
+                    print(f"\nОбрабатываем задачу {task_id} ({i}/{len(tasks)})")
+
+                    if self.solve_task(task_url, task_id, prepared=prepared):
+                        successful_tasks += 1
+            finally:
+                prefetcher.close()
+        else:
+            for i, (task_id, task_url) in enumerate(tasks, 1):
+                if self.budget_exhausted():
+                    break
+                print(f"\nОбрабатываем задачу {task_id} ({i}/{len(tasks)})")
+
+                if self.solve_task(task_url, task_id):
+                    successful_tasks += 1
+        return successful_tasks
+
+    def authorize(self):
+        """Проверяем вход на сайт: сначала по сохраненной сессии, затем в браузере ждем ручной
+        авторизации, без браузера - по HTTP. Куки успешного входа запоминаются для следующих запусков"""
+        if self.restore_session():
+            return True
+        if self.driver is None:
+            if self.http is None:
+                self.http = ACMPHttpTransport(self.site_url, self.auth_cookies, rate_limiter=self.rate_limiter)
+            authorized, user_id, user_name = login_status(self.http.get(f"{self.site_url}/index.asp?main=tasks"))
+            if user_id or user_name:
+                self.user_id, self.user_name = user_id, user_name
+        else:
+            self.open_page(f"{self.site_url}/index.asp?main=tasks")
+            print("Страница загружена, ожидаем авторизации...")
+            authorized = self.wait_for_authorization()
+        if authorized:
+            self.save_session()
+        return authorized
+
+    def restore_session(self):
+        """Вход по сохраненным кукам без ожидания ручной авторизации; истекшая сессия удаляется"""
+        session = self.session.load() if self.session else None
+        if session is None:
+            return False
+        try:
+            if self.driver is None and self.http is None:
+                self.http = ACMPHttpTransport(self.site_url, user_agent=session.get("user_agent"),
+                                              rate_limiter=self.rate_limiter)
+            self.apply_cookies(session["cookies"])
+            if self.driver is None:
+                page_html = self.http.get(f"{self.site_url}/index.asp?main=tasks")
+            else:
+                self.open_page(f"{self.site_url}/index.asp?main=tasks")
+                page_html = self.driver.page_source
+            authorized, user_id, user_name = login_status(page_html)
+        except Exception as e:
+            print(f"Не удалось восстановить сессию: {e}")
+            authorized = False
+        if not authorized:
+            print("Сохраненная сессия недействительна, нужен вход")
+            self.session.clear()
+            self.auth_cookies = []
+            return False
+        self.user_id = user_id or session.get("user_id") or self.user_id
+        self.user_name = user_name or session.get("user_name") or self.user_name
+        print(f"Вход по сохраненной сессии ({self.user_name or 'пользователь'})")
+        return True
+
+    def save_session(self):
+        """Запоминаем куки входа: для перезапуска браузера и следующих запусков"""
+        self.capture_cookies()
+        if not self.session:
+            return
+        try:
+            user_agent = self.driver.execute_script("return navigator.userAgent") if self.driver else None
+        except Exception:
+            user_agent = None
+        self.session.save(self.auth_cookies, self.user_id, self.user_name, user_agent)
+
+    def driver_alive(self):
+        """Проверка здоровья браузера: отвечают ли chromedriver и вкладка"""
+        if self.driver is None:
+            return True
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def check_driver(self):
+        if not self.driver_alive():
+            raise DriverCrashedError("браузер не отвечает")
+
+    def restart_driver(self):
+        """Перезапускаем упавший браузер и возвращаем в него куки входа"""
+        with self.tracer.span("driver_restart"):
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = self.create_driver(self.browser, self.user_data_dir)
+            self.wait = WebDriverWait(self.driver, 20)
+            self.driver_restarts += 1
+            self.apply_cookies(self.auth_cookies)
+            self.open_page(f"{self.site_url}/index.asp?main=tasks")
+            if not login_status(self.driver.page_source)[0]:
+                print("После перезапуска браузера вход не восстановлен")
+
+    def run_all_tasks(self, workers=1, resubmit=False):
         print("Запуск ACMP решателя...")
         print(f"Загружено решений из истории: {len(self.solutions_history)} задач")
         print(f"Загружено лучших решений: {len(self.best_solutions)} задач")
 
         try:
-            self.driver.get("https://acmp.ru/index.asp?main=tasks")
-            print("Страница загружена, ожидаем авторизации...")
-
-            if not self.wait_for_authorization():
+            if not self.authorize():
                 print("Не удалось дождаться авторизации.")
-                return
+                return 0
 
             print("Авторизация успешна, начинаем решение задач...")
-            task_urls = self.get_all_task_urls()
-            successful_tasks = 0
+            if self.transport == "http":
+                self.enable_http_transport()
 
-            for i, task_url in enumerate(task_urls, 1):
-                print(f"\nОбрабатываем задачу {i}/1000")
+            if resubmit:
+                self.resubmit_accepted()
+                return 0
 
-                if self.solve_task_with_retry(task_url, i):
-                    successful_tasks += 1
-                if i < len(task_urls):
-                    self.driver.get("https://acmp.ru/index.asp?main=tasks")
-                    time.sleep(2)
+            tasks = self.get_pending_tasks()
+            successful_tasks = 0
+            pool = None
+            if workers > 1:
+                self.capture_cookies()
+                pool = ACMPWorkerPool(self, workers)
+
+            try:
+                if self.scheduler:
+                    run, deferred = self.scheduler.plan(tasks)
+                else:
+                    run, deferred = tasks, []
+                successful_tasks += self.run_tasks(run, pool)
+                if deferred and not self.budget_exhausted():
+                    print(f"\nВторой проход: отложенные задачи ({len(deferred)})")
+                    run, _ = self.scheduler.plan(deferred, deferred_pass=True)
+                    successful_tasks += self.run_tasks(run, pool)
+            finally:
+                if pool:
+                    pool.close()
+                    pool.print_report()
+            if self.budget_exhausted():
+                print("Бюджет прогона исчерпан, остальные задачи остаются на следующий запуск")
 
             print(f"\nРабота завершена!")
-            print(f"Всего задач: {len(task_urls)}")
+            print(f"Всего задач: {len(tasks)}")
             print(f"Успешно решено: {successful_tasks}")
-            print(f"Процент успеха: {successful_tasks / len(task_urls) * 100:.1f}%" if len(
-                task_urls) > 0 else "Процент успеха: 0%")
+            print(f"Процент успеха: {successful_tasks / len(tasks) * 100:.1f}%" if len(
+                tasks) > 0 else "Процент успеха: 0%")
+            print(f"Состояние прогона: {self.manifest.summary()}")
+            self.tracer.summary()
+            if self.prompt_sizes:
+                print(f"Размер запросов к модели: в среднем ~{sum(self.prompt_sizes) // len(self.prompt_sizes)} "
+                      f"токенов, максимум ~{max(self.prompt_sizes)}")
+            if self.cache:
+                self.cache.report()
+            if self.client:
+                self.client.router.report()
             print(f"История сохранена в: {self.solutions_file}")
             print(f"Лучшие решения сохранены в: {self.best_solutions_file}")
+            return successful_tasks
 
         except Exception as e:
             print(f"Критическая ошибка: {e}")
+            return 0
+
+    def close(self):
+        if self.http:
+            self.http.close()
+        if not self.is_worker:
+            self.save_solutions_history()
+            self.store.close()
+            if self.client:
+                self.client.router.save()
+                self.client.close()
+            if self.cache:
+                self.cache.close()
+            if self.corpus:
+                self.corpus.close()
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                print(f"Ошибка закрытия браузера: {e}")
+
+
+class ACMPWorkerPool:
+    """Пул браузерных сессий: планировщик раздает задачи, история пишется под общей блокировкой"""
+
+    def __init__(self, solver, workers):
+        self.solver = solver
+        self.workers = [solver]
+        for _ in range(workers - 1):
+            self.workers.append(solver.spawn_worker())
+        self.tasks = queue.Queue()
+        self.stats = [{"tasks": 0, "accepted": 0, "busy": 0.0} for _ in self.workers]
+        self.started_at = None
+        self.finished_at = None
+
+    def _worker_loop(self, index):
+        worker = self.workers[index]
+        stats = self.stats[index]
+        while True:
+            if worker.budget_exhausted():
+                return
+            try:
+                task_id, task_url = self.tasks.get_nowait()
+            except queue.Empty:
+                return
+            print(f"\n[Сессия {index + 1}] Обрабатываем задачу {task_id}")
+            start = time.time()
+            try:
+                if worker.solve_task(task_url, task_id):
+                    stats["accepted"] += 1
+            except Exception as e:
+                print(f"[Сессия {index + 1}] Ошибка при решении задачи {task_id}: {e}")
+            finally:
+                stats["tasks"] += 1
+                stats["busy"] += time.time() - start
+                self.tasks.task_done()
+
+    def run(self, tasks):
+        """Решаем задачи в заданном порядке; пул можно запускать несколько раз (проходы планировщика)"""
+        for task in tasks:
+            self.tasks.put(task)
+
+        accepted_before = sum(stats["accepted"] for stats in self.stats)
+        self.started_at = self.started_at or time.time()
+        threads = [threading.Thread(target=self._worker_loop, args=(i,), daemon=True)
+                   for i in range(len(self.workers))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.finished_at = time.time()
+        # Задачи, не начатые из-за бюджета, остаются в манифесте для следующего запуска
+        while not self.tasks.empty():
+            self.tasks.get_nowait()
+            self.tasks.task_done()
+        return sum(stats["accepted"] for stats in self.stats) - accepted_before
+
+    def print_report(self):
+        elapsed = max((self.finished_at or time.time()) - (self.started_at or time.time()), 1e-9)
+        print("\nПроизводительность сессий:")
+        total_tasks = 0
+        for i, (worker, stats) in enumerate(zip(self.workers, self.stats), 1):
+            total_tasks += stats["tasks"]
+            per_hour = stats["tasks"] / elapsed * 3600
+            restarts = f", перезапусков браузера {worker.driver_restarts}" if worker.driver_restarts else ""
+            print(f"  Сессия {i}: задач {stats['tasks']}, решено {stats['accepted']}, "
+                  f"занята {stats['busy']:.1f} с, {per_hour:.1f} задач/час{restarts}")
+        print(f"  Всего: {total_tasks / elapsed * 3600:.1f} задач/час за {elapsed:.1f} с")
 
     def close(self):
-        self.driver.quit()
+        for worker in self.workers[1:]:
+            try:
+                worker.close()
+            except Exception as e:
+                print(f"Ошибка закрытия сессии: {e}")
+
+
+def task_range_arg(value):
+    """Диапазон номеров задач вида 555-1000"""
+    match = re.fullmatch(r'\s*(\d+)\s*-\s*(\d+)\s*', value)
+    if not match or int(match.group(1)) > int(match.group(2)):
+        raise argparse.ArgumentTypeError("ожидается диапазон вида 555-1000")
+    return int(match.group(1)), int(match.group(2))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="ИИ решатель задач ACMP")
+    parser.add_argument("--storage", choices=sorted(STORAGE_BACKENDS), default="jsonl",
+                        help="хранилище истории решений")
+    parser.add_argument("--bench-store", action="store_true",
+                        help="замерить стоимость записи в хранилище и выйти")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="количество параллельных браузерных сессий")
+    parser.add_argument("--transport", choices=["browser", "http"], default="browser",
+                        help="загрузка задач и отправка решений: через браузер или напрямую по HTTP")
+    parser.add_argument("--no-prejudge", action="store_true",
+                        help="не проверять решения локально на примерах перед отправкой")
+    parser.add_argument("--candidates", type=int, default=1,
+                        help="сколько решений запрашивать у модели параллельно на одну попытку")
+    parser.add_argument("--llm-base-url", default="https://openrouter.ai/api/v1",
+                        help="адрес OpenAI-совместимого API (например, локальный тестовый сервер)")
+    parser.add_argument("--llm-concurrency", type=int, default=4,
+                        help="максимум одновременных запросов к модели")
+    parser.add_argument("--models", default=None,
+                        help="модели через запятую или JSON файл со списком моделей и их лимитами "
+                             "(max_concurrency, timeout, prompt_price, completion_price, max_cost)")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="ждать полный ответ модели вместо потока с остановкой после блока кода")
+    parser.add_argument("--model-stats", default="model_stats.json",
+                        help="файл статистики моделей для адаптивного выбора")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="не использовать кэш задач и ответов модели")
+    parser.add_argument("--refresh", action="store_true",
+                        help="не читать кэш, но обновить его свежими данными")
+    parser.add_argument("--cache-dir", default=".acmp_cache", help="каталог кэша")
+    parser.add_argument("--cache-size-mb", type=int, default=200, help="предельный размер кэша")
+    parser.add_argument("--retry-exhausted", action="store_true",
+                        help="снова браться за задачи, на которых попытки уже исчерпаны")
+    parser.add_argument("--reset-manifest", action="store_true",
+                        help="начать прогон с начала, забыв сохраненное состояние")
+    parser.add_argument("--resubmit-accepted", action="store_true",
+                        help="повторно отправить сохраненные Accepted решения без обращения к модели")
+    parser.add_argument("--context-k", type=int, default=3,
+                        help="сколько похожих решенных задач добавлять в запрос")
+    parser.add_argument("--context-tokens", type=int, default=1500,
+                        help="бюджет токенов на историю решений в запросе")
+    parser.add_argument("--trace-file", default="run_trace.jsonl",
+                        help="файл с замерами времени по задачам (JSONL)")
+    parser.add_argument("--site-rps", type=float, default=2.0,
+                        help="предельная частота запросов к acmp.ru (на весь процесс)")
+    parser.add_argument("--browser", choices=["headed", "lean"], default="headed",
+                        help="основной браузер: обычное окно (для входа) или headless без картинок и шрифтов")
+    parser.add_argument("--worker-browser", choices=["headed", "lean"], default="lean",
+                        help="режим браузера дополнительных сессий пула")
+    parser.add_argument("--user-data-dir", default=None,
+                        help="каталог профиля Chrome, чтобы вход сохранялся между запусками")
+    parser.add_argument("--no-schedule", action="store_true",
+                        help="решать задачи подряд по номерам, без планировщика")
+    parser.add_argument("--schedule-log", default="schedule_log.jsonl",
+                        help="журнал решений планировщика (JSONL)")
+    parser.add_argument("--time-budget", type=float, default=None,
+                        help="бюджет прогона в минутах")
+    parser.add_argument("--token-budget", type=int, default=None,
+                        help="бюджет прогона в токенах модели")
+    parser.add_argument("--task-range", type=task_range_arg, default=(555, 1000),
+                        help="диапазон номеров задач, например 555-1000")
+    parser.add_argument("--corpus", default="task_corpus.sqlite",
+                        help="локальный корпус условий задач (SQLite)")
+    parser.add_argument("--no-corpus", action="store_true",
+                        help="не читать условия из корпуса, загружать страницы во время решения")
+    parser.add_argument("--crawl", action="store_true",
+                        help="загрузить условия задач диапазона в корпус и выйти")
+    parser.add_argument("--crawl-workers", type=int, default=8,
+                        help="потоков загрузки при обходе задач")
+    parser.add_argument("--user-id", default=None,
+                        help="id пользователя acmp.ru, если его не видно на странице после входа")
+    parser.add_argument("--session-file", default="acmp_session.json",
+                        help="файл сохраненной сессии: вход выполняется один раз и переживает перезапуски")
+    parser.add_argument("--no-session", action="store_true",
+                        help="не сохранять и не восстанавливать сессию входа")
+    parser.add_argument("--no-stress", action="store_true",
+                        help="не прогонять решения на максимальных данных перед отправкой")
+    parser.add_argument("--stress-slack", type=float, default=1.5,
+                        help="во сколько раз оценка времени может превысить лимит задачи до отказа")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
+    args = parse_args()
+    if args.bench_store:
+        benchmark_store(args.storage)
+        raise SystemExit(0)
+
+    if args.crawl:
+        corpus = TaskCorpus(args.corpus)
+        try:
+            crawl_task_corpus(corpus, "https://acmp.ru", args.task_range, workers=args.crawl_workers,
+                              rate_limiter=RateLimiter(args.site_rps, burst=max(1, int(args.site_rps * 2))),
+                              refresh=args.refresh)
+            print(f"Корпус: {corpus.summary()}")
+        finally:
+            corpus.close()
+        raise SystemExit(0)
+
     api_key = input("Введите ваш OpenRouter API ключ (или Enter для демо): ").strip()
-    solver = ACMPSolverBrowser(api_key if api_key else None)
+    cache = None if args.no_cache else DiskCache(args.cache_dir, args.cache_size_mb * 1024 * 1024,
+                                                 refresh=args.refresh)
+    solver = ACMPSolverBrowser(api_key if api_key else None, storage=args.storage, transport=args.transport,
+                               prejudge=not args.no_prejudge, candidates=args.candidates,
+                               llm_base_url=args.llm_base_url, llm_concurrency=args.llm_concurrency,
+                               cache=cache, retry_exhausted=args.retry_exhausted,
+                               context_k=args.context_k, context_token_budget=args.context_tokens,
+                               trace_file=args.trace_file, site_rps=args.site_rps, browser=args.browser,
+                               worker_browser=args.worker_browser, user_data_dir=args.user_data_dir,
+                               task_range=args.task_range,
+                               corpus=None if args.no_corpus else TaskCorpus(args.corpus),
+                               models=load_model_specs(args.models), model_stats_file=args.model_stats,
+                               llm_stream=not args.no_stream, schedule=not args.no_schedule,
+                               schedule_log=args.schedule_log,
+                               time_budget=args.time_budget * 60 if args.time_budget else None,
+                               token_budget=args.token_budget, stress=not args.no_stress,
+                               stress_slack=args.stress_slack,
+                               session_file=None if args.no_session else args.session_file)
+    solver.user_id = args.user_id
+    if args.reset_manifest:
+        solver.manifest.reset()
     try:
-        solver.run_all_tasks()
+        solver.run_all_tasks(workers=args.workers, resubmit=args.resubmit_accepted)
     except KeyboardInterrupt:
         print("\nПрограмма прервана пользователем")
     except Exception as e:
         print(f"Неожиданная ошибка: {e}")
     finally:
-        solver.close()
\ No newline at end of file
+        solver.close()
@@ -0,0 +1,512 @@
+"""Прогон решателя без сети: локальный сервер с записанными (или синтетическими) задачами,
+проверкой решений и OpenAI-совместимыми ответами модели, бенчмарк всего конвейера и запись
+страниц задач с сайта для такого прогона.
+
+    python acmp_replay.py bench DIR [--workers N] ...
+    python acmp_replay.py record DIR --task-range 555-600
+
+Код бенчмарка вынесен из основного скрипта: там остается только то, что нужно для решения задач"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from email.parser import BytesParser
+from html import escape
+from urllib.parse import urlparse, parse_qs
+import importlib.util
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+
+def load_parser():
+    """Основной скрипт называется "acmp_parser (2).py" - обычным import его не загрузить"""
+    if "acmp_parser" in sys.modules:
+        return sys.modules["acmp_parser"]
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "acmp_parser (2).py")
+    spec = importlib.util.spec_from_file_location("acmp_parser", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["acmp_parser"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+acmp = load_parser()
+ACMPSolverBrowser = acmp.ACMPSolverBrowser
+LocalJudge = acmp.LocalJudge
+TaskCorpus = acmp.TaskCorpus
+crawl_task_corpus = acmp.crawl_task_corpus
+estimate_tokens = acmp.estimate_tokens
+outputs_match = acmp.outputs_match
+parse_task_html = acmp.parse_task_html
+task_id_from_url = acmp.task_id_from_url
+
+
+REPLAY_TASKS_PAGE = """<html><head><meta charset="windows-1251"></head><body>
+<a href="/index.asp?main=user&id=1">replay</a> <a href="/index.asp?main=exit">Выход</a>
+<h1>Задачи</h1></body></html>"""
+
+REPLAY_STATUS_PAGE = """<html><head><meta charset="windows-1251"></head><body>
+<table class="main refresh">
+<tr><th>ID</th><th>Дата</th><th>Автор</th><th>Задача</th><th>Язык</th><th>Результат</th><th>Тест</th><th>Время</th><th>Память</th></tr>
+{rows}
+</table></body></html>"""
+
+REPLAY_TASK_PAGE = """<html><head><meta charset="windows-1251">
+<meta name="description" content="{description}"></head><body>
+<h1>{title}</h1>
+<center><i>(Время: 1 сек. Память: 16 Мб Сложность: {difficulty}%)</i></center>
+<table><tr><td background="/images/notepad2.gif">
+<p>{statement}</p>
+<h2>Входные данные</h2>
+<p>{input_data}</p>
+<h2>Выходные данные</h2>
+<p>{output_data}</p>
+<table class="main"><tr><th>№</th><th>INPUT.TXT</th><th>OUTPUT.TXT</th></tr>
+{examples}
+</table>
+</td></tr></table>
+<form method="post" action="/index.asp?main=update&amp;mode=upload&amp;id_task={task_id}"
+      enctype="multipart/form-data">
+<select name="lang"><option value="PY" selected>Python</option></select>
+<textarea name="source"></textarea>
+<input type="submit" value="Отправить">
+</form></body></html>"""
+
+# Синтетические задачи: заголовок, условие, входные данные, решение и генератор примеров
+SYNTHETIC_TASKS = [
+    ("A+B", "Найдите сумму двух целых чисел A и B.", "Одна строка.",
+     "a, b = map(int, input().split())\nprint(a + b)", lambda i: (f"{i} {i * 3}", f"{i * 4}")),
+    ("Квадрат числа", "Выведите квадрат целого числа N.", "Одна строка.",
+     "n = int(input())\nprint(n * n)", lambda i: (f"{i + 2}", f"{(i + 2) ** 2}")),
+    ("Максимум", "Найдите наибольшее из трех чисел.", "Одна строка.",
+     "print(max(map(int, input().split())))", lambda i: (f"{i} {i + 7} {i - 1}", f"{i + 7}")),
+    ("Переворот строки", "Выведите строку S в обратном порядке.", "Одна строка.",
+     "print(input().strip()[::-1])", lambda i: (f"abc{i}", f"abc{i}"[::-1])),
+    ("Сумма чисел", "Найдите сумму N целых чисел.",
+     "В первой строке число N (1 &le; N &le; 10<sup>5</sup>). Во второй строке N целых чисел, "
+     "по модулю не превосходящих 10<sup>9</sup>.",
+     "import sys\ndata = sys.stdin.read().split()\nprint(sum(map(int, data[1:])))",
+     lambda i: (f"3\n{i} {i + 1} {i + 2}", f"{3 * i + 3}")),
+]
+
+# Сначала верное, но квадратичное решение - его должен отсеять стресс-тест
+SYNTHETIC_SLOW_SOLUTIONS = {
+    "Сумма чисел": "n = int(input())\na = list(map(int, input().split()))\ntotal = 0\nfor i in range(n):\n"
+                   "    total = sum(a[:i + 1])\nprint(total)",
+}
+
+
+SYNTHETIC_EXPLANATION = ("Пояснение: читаем входные данные, вычисляем ответ по формуле из условия и выводим его. "
+                         "Сложность решения O(1) по времени и памяти. ") * 8
+
+
+def make_synthetic_fixtures(fixtures_dir, count=20, first_task=1):
+    """Синтетический набор записей для прогона без сети: страницы задач и ответы модели.
+    Каждая четвертая задача сначала получает неверный ответ, чтобы задействовать повторные попытки,
+    для задач из SYNTHETIC_SLOW_SOLUTIONS модель сначала отвечает медленным решением"""
+    os.makedirs(os.path.join(fixtures_dir, "tasks"), exist_ok=True)
+    with open(os.path.join(fixtures_dir, "completions.jsonl"), 'w', encoding='utf-8') as completions:
+        for i in range(count):
+            task_id = first_task + i
+            name, statement, input_data, solution, make_example = SYNTHETIC_TASKS[i % len(SYNTHETIC_TASKS)]
+            title = f"{name} ({task_id})"
+            examples = "\n".join(f"<tr><td>{n}</td><td>{escape(example[0])}</td><td>{escape(example[1])}</td></tr>"
+                                 for n, example in enumerate((make_example(task_id), make_example(task_id + 1)), 1))
+            page = REPLAY_TASK_PAGE.format(task_id=task_id, title=escape(title), difficulty=5 + task_id * 7 % 90,
+                                           description=escape(statement),
+                                           statement=escape(statement), input_data=input_data,
+                                           output_data="Одна строка.", examples=examples)
+            with open(os.path.join(fixtures_dir, "tasks", f"{task_id}.html"), 'w', encoding='windows-1251') as f:
+                f.write(page)
+            if i % 4 == 3:
+                completions.write(json.dumps({"task_id": task_id, "title": title,
+                                              "content": "```python\nprint(input())\n```"}, ensure_ascii=False) + "\n")
+            if name in SYNTHETIC_SLOW_SOLUTIONS:
+                completions.write(json.dumps({"task_id": task_id, "title": title,
+                                              "content": f"```python\n{SYNTHETIC_SLOW_SOLUTIONS[name]}\n```"},
+                                             ensure_ascii=False) + "\n")
+            # Как и настоящие модели, после кода идет пояснение
+            completions.write(json.dumps({"task_id": task_id, "title": title,
+                                          "content": f"Решение:\n```python\n{solution}\n```\n"
+                                                     f"{SYNTHETIC_EXPLANATION}"}, ensure_ascii=False) + "\n")
+    print(f"Синтетические записи для {count} задач: {fixtures_dir}")
+
+
+def record_fixtures(solver, fixtures_dir):
+    """Записываем страницы задач с сайта и принятые решения как ответы модели для replay прогона"""
+    os.makedirs(os.path.join(fixtures_dir, "tasks"), exist_ok=True)
+    if not solver.authorize():
+        print("Не удалось дождаться авторизации.")
+        return 0
+    if not solver.http:
+        solver.enable_http_transport()
+
+    recorded = 0
+    with open(os.path.join(fixtures_dir, "completions.jsonl"), 'w', encoding='utf-8') as completions:
+        for task_url in solver.get_all_task_urls():
+            task_id = task_id_from_url(task_url)
+            solution = solver.best_solutions.get(str(task_id))
+            if not solution:
+                continue
+            try:
+                page_html = solver.http.get(task_url)
+            except Exception as e:
+                print(f"Ошибка загрузки задачи {task_id}: {e}")
+                continue
+            task_info = parse_task_html(page_html)
+            with open(os.path.join(fixtures_dir, "tasks", f"{task_id}.html"), 'w',
+                      encoding=solver.http.charset, errors="xmlcharrefreplace") as f:
+                f.write(page_html)
+            completions.write(json.dumps({"task_id": task_id, "title": task_info["title"],
+                                          "content": f"```python\n{solution['code']}\n```"},
+                                         ensure_ascii=False) + "\n")
+            recorded += 1
+    print(f"Записано задач: {recorded} в {fixtures_dir}")
+    return recorded
+
+
+class ReplayServer:
+    """Локальный сервер для прогона без сети: записанные страницы задач, таблица статусов
+    с локальной проверкой и задержкой judge_latency, OpenAI-совместимый /v1/chat/completions
+    с записанными ответами и задержкой llm_latency"""
+
+    def __init__(self, fixtures_dir, judge_latency=0.5, llm_latency=0.2, host="127.0.0.1", port=0):
+        self.fixtures_dir = fixtures_dir
+        self.judge_latency = judge_latency
+        self.llm_latency = llm_latency
+        self.judge = LocalJudge()
+        self.lock = threading.Lock()
+        self.submissions = []
+        self.task_pages = {}
+        self.completions = {}
+        self.completion_calls = {}
+        self.recorded_chars = 0
+        self.generated_chars = 0
+        self.load_fixtures()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.handle_get(self)
+
+            def do_POST(self):
+                server.handle_post(self)
+
+        class Server(ThreadingHTTPServer):
+            # Очередь соединений по умолчанию (5) мала для параллельного обхода - лишние SYN
+            # отбрасываются и клиент ждет повтора около секунды
+            request_queue_size = 128
+            daemon_threads = True
+
+        self.httpd = Server((host, port), Handler)
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def load_fixtures(self):
+        tasks_dir = os.path.join(self.fixtures_dir, "tasks")
+        for name in os.listdir(tasks_dir):
+            if name.endswith(".html"):
+                with open(os.path.join(tasks_dir, name), 'rb') as f:
+                    self.task_pages[name[:-5]] = f.read()
+        with open(os.path.join(self.fixtures_dir, "completions.jsonl"), 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.completions.setdefault(entry["title"], []).append(entry["content"])
+
+    def task_ids(self):
+        return sorted(int(task_id) for task_id in self.task_pages if task_id.isdigit())
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    @staticmethod
+    def send(handler, body, content_type="text/html; charset=windows-1251", status=200, headers=None):
+        if isinstance(body, str):
+            body = body.encode("windows-1251", errors="xmlcharrefreplace")
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def handle_get(self, handler):
+        query = parse_qs(urlparse(handler.path).query)
+        page = query.get("main", [""])[0]
+        if page == "task":
+            body = self.task_pages.get(query.get("id_task", [""])[0])
+            if body is None:
+                self.send(handler, "<html><body>Ошибка: задача не найдена</body></html>")
+                return
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            if handler.headers.get("If-None-Match") == etag:
+                handler.send_response(304)
+                handler.send_header("ETag", etag)
+                handler.end_headers()
+            else:
+                self.send(handler, body, headers={"ETag": etag})
+        elif page == "status":
+            self.send(handler, self.status_page())
+        else:
+            self.send(handler, REPLAY_TASKS_PAGE)
+
+    def handle_post(self, handler):
+        body = handler.rfile.read(int(handler.headers.get("Content-Length") or 0))
+        if urlparse(handler.path).path.endswith("/chat/completions"):
+            self.handle_completion(handler, json.loads(body))
+            return
+
+        content_type = handler.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/"):
+            message = BytesParser().parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+            fields = {part.get_param("name", header="content-disposition"):
+                      part.get_payload(decode=True).decode("windows-1251", errors="replace")
+                      for part in message.get_payload()}
+        else:
+            fields = {key: values[0] for key, values in
+                      parse_qs(body.decode("ascii"), encoding="windows-1251").items()}
+        task_id = parse_qs(urlparse(handler.path).query).get("id_task", [""])[0]
+        self.submit(task_id, fields.get("source", ""))
+        self.send(handler, self.status_page())
+
+    def submit(self, task_id, code):
+        """Посылка проверяется в фоне; вердикт виден не раньше чем через judge_latency"""
+        with self.lock:
+            submission = {"id": str(len(self.submissions) + 1), "task_id": task_id, "result": None, "test": "",
+                          "ready_at": time.time() + self.judge_latency}
+            self.submissions.append(submission)
+
+        def judge():
+            page = self.task_pages.get(task_id, b"")
+            tests = parse_task_html(page.decode("windows-1251", errors="replace"))["example_tests"] if page else []
+            submission["result"] = "Accepted"
+            for i, test in enumerate(tests, 1):
+                result = self.judge.run(code, test["input"])
+                if result["verdict"] == "OK" and outputs_match(result["output"], test["output"]):
+                    continue
+                if "SyntaxError" in result["error"]:
+                    submission["result"] = "Compilation error"
+                else:
+                    submission["result"] = {"OK": "Wrong answer", "TLE": "Time limit exceeded",
+                                            "MLE": "Memory limit exceeded",
+                                            "RE": "Runtime error"}[result["verdict"]]
+                # Как на acmp.ru: номер теста - в отдельной колонке таблицы статусов
+                submission["test"] = str(i)
+                break
+
+        threading.Thread(target=judge, daemon=True).start()
+        return submission["id"]
+
+    def status_page(self):
+        now = time.time()
+        rows = []
+        with self.lock:
+            submissions = list(reversed(self.submissions))
+        for submission in submissions:
+            ready = submission["result"] and now >= submission["ready_at"]
+            result, test = (submission["result"], submission["test"]) if ready else ("Testing", "")
+            rows.append(f"<tr><td>{submission['id']}</td><td>{datetime.now():%d.%m.%Y %H:%M}</td>"
+                        f"<td><a href=\"/index.asp?main=user&amp;id=1\">replay</a></td>"
+                        f"<td><a href=\"/index.asp?main=task&amp;id_task={submission['task_id']}\">"
+                        f"{submission['task_id']}</a></td><td>PY</td><td>{result}</td><td>{test}</td><td>0.01</td>"
+                        f"<td>1 Мб</td></tr>")
+        return REPLAY_STATUS_PAGE.format(rows="\n".join(rows))
+
+    def handle_completion(self, handler, request):
+        """Записанный ответ для задачи по ее заголовку в запросе; повторные запросы идут по записям дальше"""
+        prompt = "\n".join(str(message.get("content", "")) for message in request.get("messages", []))
+        match = re.search(r'ЗАГОЛОВОК: (.*)', prompt)
+        title = match.group(1).strip() if match else ""
+        recorded = self.completions.get(title) or ["```python\nprint(input())\n```"]
+        with self.lock:
+            call = self.completion_calls.get(title, 0)
+            self.completion_calls[title] = call + 1
+        content = recorded[min(call, len(recorded) - 1)]
+        with self.lock:
+            self.recorded_chars += len(content)
+        if request.get("stream"):
+            self.stream_completion(handler, request, content, call)
+            return
+        time.sleep(self.llm_latency)
+        with self.lock:
+            self.generated_chars += len(content)
+        response = {
+            "id": f"replay-{call}", "object": "chat.completion", "created": int(time.time()),
+            "model": request.get("model", "replay"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(content),
+                      "total_tokens": estimate_tokens(prompt) + estimate_tokens(content)},
+        }
+        self.send(handler, json.dumps(response, ensure_ascii=False).encode("utf-8"), "application/json")
+
+    def stream_completion(self, handler, request, content, call, chunk_size=16):
+        """Ответ потоком SSE: llm_latency распределена по кускам, обрыв соединения клиентом
+        останавливает генерацию"""
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.end_headers()
+        chunks = [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)] or [""]
+        base = {"id": f"replay-{call}", "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": request.get("model", "replay")}
+        try:
+            for chunk in chunks:
+                time.sleep(self.llm_latency / len(chunks))
+                event = dict(base, choices=[{"index": 0, "delta": {"content": chunk}, "finish_reason": None}])
+                handler.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+                handler.wfile.flush()
+                with self.lock:
+                    self.generated_chars += len(chunk)
+            prompt = "\n".join(str(message.get("content", "")) for message in request.get("messages", []))
+            event = dict(base, choices=[], usage={"prompt_tokens": estimate_tokens(prompt),
+                                                  "completion_tokens": estimate_tokens(content),
+                                                  "total_tokens": estimate_tokens(prompt) + estimate_tokens(content)})
+            handler.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def peak_memory_mb():
+    """Пиковый RSS процесса в Мб (ru_maxrss в Кб на Linux и в байтах на macOS)"""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def run_replay_benchmark(fixtures_dir, judge_latency=0.5, llm_latency=0.2, workers=1, candidates=1,
+                         storage="jsonl", prejudge=True, site_rps=100.0, use_corpus=True, llm_stream=True,
+                         stress=True):
+    """Прогон всего конвейера на записанных данных: обход задач в корпус (use_corpus), одна задача
+    через solve_task_with_retry, затем run_all_tasks по остальным. Все файлы - во временном каталоге"""
+    if not os.path.exists(os.path.join(fixtures_dir, "completions.jsonl")):
+        make_synthetic_fixtures(fixtures_dir)
+    fixtures_dir = os.path.abspath(fixtures_dir)
+    server = ReplayServer(fixtures_dir, judge_latency, llm_latency).start()
+    task_ids = server.task_ids()
+    if not task_ids:
+        print("Нет записанных задач")
+        server.close()
+        return None
+
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        solver = None
+        crawl_time = 0.0
+        try:
+            corpus = None
+            if use_corpus:
+                corpus = TaskCorpus()
+                start = time.perf_counter()
+                crawl_task_corpus(corpus, server.url, (task_ids[0], task_ids[-1]))
+                crawl_time = time.perf_counter() - start
+            solver = ACMPSolverBrowser("replay", site_url=server.url, storage=storage, transport="http",
+                                       prejudge=prejudge, candidates=candidates, llm_base_url=f"{server.url}/v1",
+                                       site_rps=site_rps, browser="none", task_range=(task_ids[0], task_ids[-1]),
+                                       corpus=corpus, llm_stream=llm_stream, stress=stress)
+            if not solver.authorize():
+                print("Replay сервер не принял вход")
+                return None
+            solver.enable_http_transport()
+
+            first_id = task_ids[0]
+            start = time.perf_counter()
+            with solver.tracer.task(first_id):
+                solver.solve_task_with_retry(f"{server.url}/index.asp?main=task&id_task={first_id}", first_id)
+            single_task = time.perf_counter() - start
+
+            start = time.perf_counter()
+            solved = solver.run_all_tasks(workers=workers)
+            elapsed = time.perf_counter() - start
+        finally:
+            if solver:
+                solver.close()
+            os.chdir(original_dir)
+            server.close()
+
+    report = {
+        "tasks": len(task_ids) - 1,
+        "solved": solved,
+        "crawl_s": round(crawl_time, 3),
+        "single_task_s": round(single_task, 3),
+        "run_s": round(elapsed, 3),
+        "tasks_per_s": round((len(task_ids) - 1) / max(elapsed, 1e-9), 3),
+        "peak_rss_mb": round(peak_memory_mb(), 1),
+        "llm_generated_share": round(server.generated_chars / max(server.recorded_chars, 1), 3),
+    }
+    print(f"\nReplay бенчмарк ({fixtures_dir}): задержка проверки {judge_latency} с, модели {llm_latency} с")
+    if use_corpus:
+        print(f"  обход задач в корпус: {report['crawl_s']:.2f} с")
+    print(f"  одна задача (solve_task_with_retry): {report['single_task_s']:.2f} с")
+    print(f"  все задачи (run_all_tasks): решено {solved}/{report['tasks']} за {report['run_s']:.2f} с, "
+          f"{report['tasks_per_s']:.2f} задач/с")
+    print(f"  пиковая память: {report['peak_rss_mb']:.1f} Мб")
+    print(f"  модель сгенерировала {report['llm_generated_share'] * 100:.0f}% текста записанных ответов")
+    print("BENCH " + json.dumps(report))
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Прогон решателя ACMP без сети")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bench = commands.add_parser("bench", help="прогон на записанных задачах и ответах модели "
+                                              "(если записей нет - создаются синтетические)")
+    bench.add_argument("fixtures_dir", metavar="DIR")
+    bench.add_argument("--judge-latency", type=float, default=0.5, help="задержка вердикта, с")
+    bench.add_argument("--llm-latency", type=float, default=0.2, help="задержка ответа модели, с")
+    bench.add_argument("--workers", type=int, default=1, help="число браузерных сессий")
+    bench.add_argument("--candidates", type=int, default=1, help="кандидатов решения на задачу")
+    bench.add_argument("--storage", choices=sorted(acmp.STORAGE_BACKENDS), default="jsonl",
+                       help="хранилище истории решений")
+    bench.add_argument("--no-prejudge", action="store_true", help="без локальной проверки на примерах")
+    bench.add_argument("--no-corpus", action="store_true", help="без обхода задач в корпус")
+    bench.add_argument("--no-stream", action="store_true", help="без потокового ответа модели")
+    bench.add_argument("--no-stress", action="store_true", help="без стресс-теста перед отправкой")
+
+    record = commands.add_parser("record", help="записать страницы задач с принятыми решениями в DIR")
+    record.add_argument("fixtures_dir", metavar="DIR")
+    record.add_argument("--task-range", type=acmp.task_range_arg, default=(555, 1000),
+                        help="диапазон номеров задач, например 555-1000")
+    record.add_argument("--storage", choices=sorted(acmp.STORAGE_BACKENDS), default="jsonl",
+                        help="хранилище истории решений")
+    record.add_argument("--user-data-dir", default=None, help="каталог профиля Chrome")
+    record.add_argument("--session-file", default="acmp_session.json", help="файл сохраненной сессии")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "bench":
+        report = run_replay_benchmark(args.fixtures_dir, args.judge_latency, args.llm_latency, workers=args.workers,
+                                      candidates=args.candidates, storage=args.storage,
+                                      prejudge=not args.no_prejudge, use_corpus=not args.no_corpus,
+                                      llm_stream=not args.no_stream, stress=not args.no_stress)
+        # Нерешенные задачи - регрессия: ненулевой код возврата, чтобы прогон в CI падал
+        raise SystemExit(0 if report and report["solved"] == report["tasks"] else 1)
+
+    solver = ACMPSolverBrowser(None, storage=args.storage, transport="http", user_data_dir=args.user_data_dir,
+                               task_range=args.task_range, session_file=args.session_file)
+    try:
+        recorded = record_fixtures(solver, args.fixtures_dir)
+    finally:
+        solver.close()
+    raise SystemExit(0 if recorded else 1)
@@ -0,0 +1,23 @@
+import pathlib
+import sys
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+FIXTURES = pathlib.Path(__file__).resolve().parent / "fixtures"
+
+sys.path.insert(0, str(ROOT))
+from acmp_replay import load_parser  # noqa: E402
+
+ACMP = load_parser()
+
+
+@pytest.fixture(scope="session")
+def acmp():
+    return ACMP
+
+
+@pytest.fixture(scope="session")
+def task_page():
+    """Сохраненная страница задачи acmp.ru (в кодировке сайта)"""
+    return (FIXTURES / "task_1.html").read_bytes().decode("windows-1251")
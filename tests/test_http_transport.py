@@ -0,0 +1,111 @@
+import threading
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+
+import pytest
+
+
+class StubSite:
+    """Заглушка acmp.ru: отдает сохраненную страницу задачи и запоминает POST отправки"""
+
+    def __init__(self, task_page):
+        self.task_page = task_page.encode("windows-1251")
+        self.posts = []
+        self.gets = 0
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                site.gets += 1
+                self.reply(site.task_page)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                site.posts.append({"path": self.path, "headers": dict(self.headers), "body": body})
+                self.reply("<html><body>Решение принято</body></html>".encode("windows-1251"))
+
+            def reply(self, body):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=windows-1251")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def site(task_page):
+    stub = StubSite(task_page)
+    yield stub
+    stub.close()
+
+
+def multipart_fields(post):
+    message = BytesParser().parsebytes(f"Content-Type: {post['headers']['Content-Type']}\r\n\r\n".encode()
+                                       + post["body"])
+    return {part.get_param("name", header="content-disposition"): part.get_payload(decode=True).decode("windows-1251")
+            for part in message.get_payload()}
+
+
+def test_submit_posts_multipart_form(acmp, site):
+    task_url = f"{site.url}/index.asp?main=task&id_task=1"
+    transport = acmp.ACMPHttpTransport(site.url)
+    try:
+        transport.get_task(task_url)
+        response = transport.submit(task_url, "print('Привет')")
+    finally:
+        transport.close()
+
+    assert "Решение принято" in response
+    assert site.gets == 1, "форма берется из уже загруженной страницы"
+    post, = site.posts
+    assert post["path"] == "/index.asp?main=update&mode=upload&id_task=1"
+    assert post["headers"]["Referer"] == task_url
+    assert multipart_fields(post) == {"id_task": "1", "lang": "PY", "source": "print('Привет')"}
+
+
+def test_submit_posts_urlencoded_form(acmp, site, task_page):
+    task_url = f"{site.url}/index.asp?main=task&id_task=1"
+    transport = acmp.ACMPHttpTransport(site.url)
+    try:
+        transport.forms[task_url] = dict(acmp.parse_submit_form(task_page, task_url), multipart=False)
+        transport.submit(task_url, "print(1 + 1)")
+    finally:
+        transport.close()
+
+    post, = site.posts
+    assert post["headers"]["Content-Type"] == "application/x-www-form-urlencoded"
+    assert parse_qs(post["body"].decode("ascii")) == {"id_task": ["1"], "lang": ["PY"], "source": ["print(1 + 1)"]}
+
+
+def test_prefetched_form_is_reused_by_submit(acmp, site):
+    task_url = f"{site.url}/index.asp?main=task&id_task=1"
+    solver = SimpleNamespace(site_url=site.url, auth_cookies=[], http=acmp.ACMPHttpTransport(site.url),
+                             rate_limiter=None, cache=None, candidates=1,
+                             corpus_task=lambda *args: None,
+                             cached_parse=lambda task_id, page_html, parse: parse(),
+                             build_task_prompt=lambda task_info: "prompt",
+                             ask_ai_async=lambda *args, **kwargs: None)
+    prefetcher = acmp.TaskPrefetcher(solver, [(1, task_url)])
+    try:
+        (_, _, prepared), = list(prefetcher)
+        solver.http.submit(task_url, "print(5)")
+    finally:
+        prefetcher.close()
+        solver.http.close()
+
+    assert prepared["task_info"]["title"] == "1. A+B"
+    assert site.gets == 1, "submit не должен повторно загружать страницу задачи"
+    assert len(site.posts) == 1
@@ -0,0 +1,28 @@
+def make_client(acmp, tmp_path, answers):
+    client = acmp.AsyncLLMClient("test-key", cache=acmp.DiskCache(str(tmp_path / "cache")), stream=False)
+    calls = []
+
+    async def request(messages, temperature=None, usage=None):
+        calls.append(messages)
+        return answers[len(calls) - 1], next(iter(client.router.specs))
+
+    client._request = request
+    return client, calls
+
+
+def test_repeated_ask_reads_cache(acmp, tmp_path):
+    client, calls = make_client(acmp, tmp_path, ["первый", "второй"])
+    messages = [{"role": "user", "content": "задача"}]
+
+    assert client.complete(messages) == "первый"
+    assert client.complete(messages) == "первый"
+    assert len(calls) == 1
+
+
+def test_repair_ask_bypasses_cache(acmp, tmp_path):
+    client, calls = make_client(acmp, tmp_path, ["первый", "второй"])
+    messages = [{"role": "user", "content": "исправь решение"}]
+
+    assert client.complete(messages) == "первый"
+    assert client.complete(messages, use_cache=False) == "второй"
+    assert len(calls) == 2
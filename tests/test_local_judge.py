@@ -0,0 +1,20 @@
+import os
+
+import pytest
+
+posix_only = pytest.mark.skipif(os.name != "posix", reason="лимиты ставятся через resource")
+
+
+def test_run_reads_stdin_and_output_file(acmp):
+    judge = acmp.LocalJudge()
+
+    assert judge.run("print(sum(map(int, input().split())))", "2 3\n")["output"] == "5\n"
+    assert judge.run("open('OUTPUT.TXT', 'w').write(open('INPUT.TXT').read())", "42\n")["output"] == "42\n"
+
+
+@posix_only
+def test_run_applies_memory_and_time_limits(acmp):
+    judge = acmp.LocalJudge(time_limit=1, memory_limit_mb=256)
+
+    assert judge.run("x = [0] * 10 ** 9", "")["verdict"] == "MLE"
+    assert judge.run("while True:\n    pass", "")["verdict"] == "TLE"
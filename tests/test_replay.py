@@ -0,0 +1,11 @@
+import acmp_replay
+
+
+def test_replay_benchmark_solves_synthetic_tasks(tmp_path):
+    fixtures_dir = tmp_path / "fixtures"
+    acmp_replay.make_synthetic_fixtures(str(fixtures_dir), count=6)
+
+    report = acmp_replay.run_replay_benchmark(str(fixtures_dir), judge_latency=0.01, llm_latency=0.0)
+
+    assert report["tasks"] == 5
+    assert report["solved"] == report["tasks"]
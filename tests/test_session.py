@@ -0,0 +1,30 @@
+import os
+import stat
+
+import pytest
+
+
+@pytest.mark.skipif(os.name != "posix", reason="права файлов POSIX")
+def test_session_file_is_private_from_creation(acmp, tmp_path, monkeypatch):
+    session_file = str(tmp_path / "acmp_session.json")
+    # Устаревший временный файл с открытыми правами не должен их передать
+    with open(session_file + ".tmp", 'w') as f:
+        f.write("{}")
+    os.chmod(session_file + ".tmp", 0o644)
+    modes = []
+    replace = os.replace
+
+    def spy_replace(src, dst):
+        modes.append(stat.S_IMODE(os.stat(src).st_mode))
+        replace(src, dst)
+
+    monkeypatch.setattr(acmp.os, "replace", spy_replace)
+    old_umask = os.umask(0o022)
+    try:
+        acmp.SessionStore(session_file).save([{"name": "ASPSESSIONID", "value": "secret"}], user_id="123456")
+    finally:
+        os.umask(old_umask)
+
+    assert modes == [0o600]
+    assert stat.S_IMODE(os.stat(session_file).st_mode) == 0o600
+    assert acmp.SessionStore(session_file).load()["user_id"] == "123456"
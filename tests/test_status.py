@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+STATUS_PAGE = """<html><body><table class="main refresh">
+<tr><th>ID</th><th>Дата</th><th>Автор</th><th>Задача</th><th>Язык</th><th>Результат</th><th>Время</th><th>Память</th></tr>
+<tr><td>9002</td><td>12:01</td><td><a href="/index.asp?main=user&id=777">Чужой</a></td>
+<td><a href="/index.asp?main=task&id_task=1">1</a></td><td>PY</td><td>Accepted</td><td>0,01</td><td>1 Мб</td></tr>
+<tr><td>9001</td><td>12:00</td><td><a href="/index.asp?main=user&id=123456">Иванов Иван</a></td>
+<td><a href="/index.asp?main=task&id_task=1">1</a></td><td>PY</td><td>Wrong answer</td><td>0,02</td><td>1 Мб</td></tr>
+</table></body></html>"""
+
+
+def solver(floor=9000, **user):
+    return SimpleNamespace(submission_floors={"1": floor}, **dict({"user_id": None, "user_name": None}, **user))
+
+
+def test_find_submission_id_takes_own_new_row(acmp):
+    find = acmp.ACMPSolverBrowser.find_submission_id
+
+    assert find(solver(user_id="123456"), STATUS_PAGE, 1) == "9001"
+    assert find(solver(user_name="Иванов Иван"), STATUS_PAGE, 1) == "9001"
+
+
+def test_find_submission_id_skips_rows_from_before_the_post(acmp):
+    # Посылка не зарегистрировалась: в таблице только старая посылка прошлого запуска
+    find = acmp.ACMPSolverBrowser.find_submission_id
+
+    assert find(solver(floor=9002, user_id="123456"), STATUS_PAGE, 1) is None
+    assert find(SimpleNamespace(submission_floors={}, user_id="123456", user_name=None), STATUS_PAGE, 1) is None
+
+
+def test_find_submission_id_refuses_unknown_user(acmp):
+    assert acmp.ACMPSolverBrowser.find_submission_id(solver(), STATUS_PAGE, 1) is None
+
+
+STATUS_PAGE_WITH_TEST_COLUMN = """<html><body><table class="main refresh">
+<tr><th>ID</th><th>Дата</th><th>Автор</th><th>Задача</th><th>Язык</th><th>Результат</th><th>Тест</th>
+<th>Время</th><th>Память</th></tr>
+<tr><td>9004</td><td>12:03</td><td><a href="/index.asp?main=user&id=123456">Иванов Иван</a></td>
+<td><a href="/index.asp?main=task&id_task=2">2</a></td><td>PY</td><td>Wrong answer</td><td>7</td>
+<td>0,02</td><td>1 Мб</td></tr>
+<tr><td>9003</td><td>12:02</td><td><a href="/index.asp?main=user&id=123456">Иванов Иван</a></td>
+<td><a href="/index.asp?main=task&id_task=1">1</a></td><td>PY</td><td>Accepted</td><td>12</td>
+<td>0,01</td><td>1 Мб</td></tr>
+</table></body></html>"""
+
+
+def test_parse_status_rows_reads_test_column(acmp):
+    wrong, accepted = acmp.parse_status_rows(STATUS_PAGE_WITH_TEST_COLUMN)
+
+    assert wrong["result"] == "Wrong answer на тесте 7"
+    assert acmp.parse_verdict(wrong["result"]) == (acmp.Verdict.WRONG_ANSWER, 7)
+    assert accepted["result"] == "Accepted"
+
+
+def test_parse_status_rows_without_test_column(acmp):
+    rows = acmp.parse_status_rows(STATUS_PAGE)
+
+    assert [row["result"] for row in rows] == ["Accepted", "Wrong answer"]
+    assert rows[1]["author_id"] == "123456"
+
+
+def test_retry_drops_repair_after_unrecognised_verdict(acmp):
+    verdicts = iter([(False, "Wrong answer на тесте 3"), (False, "Timeout"), (False, "Wrong answer")])
+    repairs = []
+
+    def generate_solution(task_info, task_id, attempt, pending, repair):
+        repairs.append(repair and repair["code"])
+        return f"print({attempt})"
+
+    retry_solver = SimpleNamespace(
+        check_driver=lambda: None, load_task=lambda url: {"title": "A+B", "full_description": ""},
+        generate_solution=generate_solution,
+        avoid_known_solution=lambda task_info, task_id, attempt, code: (code, None),
+        send_solution=lambda url, task_id, code: "9005", check_solution_status=lambda *args: next(verdicts),
+        record_model_outcome=lambda code, accepted: None, add_solution_to_history=lambda *args: None)
+
+    assert acmp.ACMPSolverBrowser.solve_task_with_retry(retry_solver, "url", 1, max_attempts=3) is False
+    assert repairs == [None, "print(1)", None]
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+ATTEMPT = {"timestamp": "2024-01-01T00:00:00", "attempt": 1, "code": "print(1)", "status": "Failed",
+           "result": "Wrong answer", "is_accepted": False}
+
+
+def open_store(acmp, backend, path):
+    if backend == "jsonl":
+        return acmp.JsonlSolutionStore(str(path / "history.jsonl"), str(path / "best.jsonl"))
+    return acmp.SqliteSolutionStore(str(path / "history.sqlite"))
+
+
+@pytest.mark.parametrize("backend", ["jsonl", "sqlite"])
+def test_interrupted_migration_resumes(acmp, backend, tmp_path):
+    legacy = tmp_path / "solutions_history.json"
+    best = tmp_path / "best_solutions.json"
+    history = {"1": [ATTEMPT, dict(ATTEMPT, attempt=2)], "2": None, "3": [dict(ATTEMPT, attempt=3)]}
+    legacy.write_text(json.dumps(history), encoding='utf-8')
+
+    store = open_store(acmp, backend, tmp_path)
+    assert acmp.migrate_json_history(store, str(legacy), str(best)) == 2
+    # Запуск после сбоя успел записать свою попытку
+    store.append_attempt(3, dict(ATTEMPT, attempt=4))
+    store.close()
+    assert legacy.exists()
+
+    history["2"] = [dict(ATTEMPT, attempt=5)]
+    legacy.write_text(json.dumps(history), encoding='utf-8')
+    store = open_store(acmp, backend, tmp_path)
+    assert acmp.migrate_json_history(store, str(legacy), str(best)) == 2
+
+    assert not legacy.exists()
+    assert [entry["attempt"] for entry in store.get_attempts(1)] == [1, 2]
+    assert [entry["attempt"] for entry in store.get_attempts(2)] == [5]
+    assert sorted(entry["attempt"] for entry in store.get_attempts(3)) == [3, 4]
+    store.close()
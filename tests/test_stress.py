@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+posix_only = pytest.mark.skipif(os.name != "posix", reason="стресс-тест только для POSIX")
+
+PAIRS_TASK = {
+    "example_tests": [{"input": "3\n1 2\n3 4\n5 6\n", "output": "21\n"}],
+    "input_data": "В первой строке число N (1 ≤ N ≤ 1000), далее N строк по два числа, "
+                  "не превосходящих по модулю 1000.",
+    "time_limit": 1,
+    "memory_limit": 16,
+}
+
+PAIRS_SOLUTION = """n = int(input())
+total = 0
+for _ in range(n):
+    a, b = map(int, input().split())
+    total += a + b
+print(total)
+"""
+
+
+def test_rows_input_counts_rows_not_tokens(acmp):
+    build, max_size = acmp.StressTester().input_builder(PAIRS_TASK)
+    lines = build(max_size).splitlines()
+
+    assert max_size == 2000
+    assert lines[0] == "1000"
+    assert len(lines) == 1001
+
+
+@posix_only
+def test_correct_rows_solution_passes(acmp):
+    assert acmp.StressTester().check(PAIRS_SOLUTION, PAIRS_TASK)["verdict"] == "OK"
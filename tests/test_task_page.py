@@ -0,0 +1,42 @@
+TASK_URL = "https://acmp.ru/index.asp?main=task&id_task=1"
+
+
+def test_parse_task_html(acmp, task_page):
+    task_info = acmp.parse_task_html(task_page)
+
+    assert task_info["title"] == "1. A+B"
+    assert "10^9" in task_info["input_data"]
+    assert task_info["output_data"].startswith("В единственную строку")
+    assert task_info["example_tests"] == [{"input": "2 3\n", "output": "5"}, {"input": "17 25\n", "output": "42"}]
+    assert task_info["time_limit"] == 1.0
+    assert task_info["memory_limit"] == 16
+    assert acmp.parse_difficulty(task_page) == 2
+
+
+def test_parse_example_tests_takes_only_the_examples_table(acmp, task_page):
+    tree = acmp.lxml_html.fromstring(task_page)
+    tables = tree.xpath(acmp.EXAMPLES_TABLE_XPATH)
+
+    assert len(tables) == 1
+    assert acmp.parse_example_tests(tables[0]) == [{"input": "2 3\n", "output": "5"},
+                                                    {"input": "17 25\n", "output": "42"}]
+
+
+def test_parse_submit_form(acmp, task_page):
+    form = acmp.parse_submit_form(task_page, TASK_URL)
+
+    assert form["action"] == "https://acmp.ru/index.asp?main=update&mode=upload&id_task=1"
+    assert form["method"] == "post"
+    assert form["multipart"] is True
+    assert form["code_field"] == "source"
+    assert form["fields"] == {"id_task": "1", "lang": "PY", "source": ""}
+
+
+def test_login_status(acmp, task_page):
+    assert acmp.login_status(task_page) == (True, "123456", "Иванов Иван")
+
+
+def test_parse_example_tests_keeps_input_whitespace(acmp):
+    table = "<table><tr><td>1</td><td>  a  b<br><br>c</td><td>c b  a</td></tr></table>"
+
+    assert acmp.parse_example_tests(table) == [{"input": "  a  b\n\nc\n", "output": "c b a"}]
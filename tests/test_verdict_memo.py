@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+import pytest
+
+
+def open_store(acmp, backend, path):
+    if backend == "jsonl":
+        return acmp.JsonlSolutionStore(str(path / "history.jsonl"), str(path / "best.jsonl"))
+    return acmp.SqliteSolutionStore(str(path / "history.sqlite"))
+
+
+def build(acmp, store):
+    return acmp.ACMPSolverBrowser.build_verdict_memo(SimpleNamespace(store=store))
+
+
+@pytest.mark.parametrize("backend", ["jsonl", "sqlite"])
+def test_memo_reloads_fingerprints_without_parsing_code(acmp, backend, tmp_path, monkeypatch):
+    store = open_store(acmp, backend, tmp_path)
+    store.append_attempt(1, {"code": "print(1)", "status": "Failed", "result": "Wrong answer"})
+    store.append_attempt(1, {"code": "print(2)", "status": "LocalFailed", "result": ""})
+    memo = build(acmp, store)
+    entry = {"code": "print( 3 )", "status": "Accepted", "result": "Accepted"}
+    verdict = memo.add(2, entry)
+    store.append_attempt(2, entry)
+    store.append_verdict(*verdict)
+    store.close()
+
+    monkeypatch.setattr(acmp, "code_fingerprint", lambda code: pytest.fail("код разбирается при загрузке"))
+    reloaded = build(acmp, open_store(acmp, backend, tmp_path))
+
+    assert reloaded.size() == 2
+    assert reloaded.by_task == memo.by_task
+    assert reloaded.by_task["2"][verdict[1]] == {"status": "Accepted", "result": "Accepted"}